@@ -17,6 +17,7 @@ from app.auth.models import User
 from app.products.models import Product
 from app.suppliers.models import Supplier, SupplierProduct
 from app.orders.models import Order, OrderProduct
+from app.kafka.models import ProcessedMessage, OutboxEvent
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,39 @@
+"""Add hot lookup indexes
+
+Revision ID: 5e0c7b2a91f4
+Revises: cf81debd3685
+Create Date: 2026-10-17 15:03:52.918274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0c7b2a91f4'
+down_revision: Union[str, None] = 'cf81debd3685'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction and does not block writes while building
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_orders_number'), 'orders', ['number'], unique=True, postgresql_concurrently=True)
+        op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_orders_supplier_id'), 'orders', ['supplier_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_order_products_product_id'), 'order_products', ['product_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_supplier_products_supplier_id_supplier_product_id', 'supplier_products', ['supplier_id', 'supplier_product_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_supplier_products_supplier_id_supplier_product_id', table_name='supplier_products', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_order_products_product_id'), table_name='order_products', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_orders_supplier_id'), table_name='orders', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_orders_user_id'), table_name='orders', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_orders_number'), table_name='orders', postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Add snapshot timestamps to stock and prices
+
+Revision ID: 9b3e6c1f2d47
+Revises: 5e0c7b2a91f4
+Create Date: 2026-10-17 18:21:07.513406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6c1f2d47'
+down_revision: Union[str, None] = '5e0c7b2a91f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('available_snapshot_at', sa.BigInteger(), nullable=True))
+    op.add_column('supplier_products', sa.Column('price_snapshot_at', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('supplier_products', 'price_snapshot_at')
+    op.drop_column('products', 'available_snapshot_at')
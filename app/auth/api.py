@@ -2,14 +2,26 @@ from fastapi import APIRouter, HTTPException, status, Response, Depends
 
 from app.auth.dependencies import get_current_user, get_current_admin_user
 from app.auth.models import User
-from app.auth.service import authenticate_user, get_password_hash, create_access_token
-from app.schemas import SMessageResponse
+from app.auth.service import authenticate_user, get_password_hash, create_access_token, PasswordHasherBusyError
+from app.schemas import SMessageResponse, SPaginationParams, SPageResponse
 from app.auth.dao import UsersDAO
 from app.auth.schemas import SUserRegister, SUserLogin, SUser, SLoginResponse
+from app.database import get_unit_of_work
+from app.dependencies import get_pagination
 
+# No router-wide unit of work: register and login hash passwords, and a transaction
+# held open across that would pin a pooled connection for the whole hash.
 router = APIRouter(prefix='/auth', tags=['Auth'])
 
 
+def _hasher_busy(e: PasswordHasherBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={'Retry-After': '1'},
+    )
+
+
 @router.post("/register/")
 async def register_user(user_data: SUserRegister) -> SMessageResponse:
     user = await UsersDAO.find_one_or_none(email=user_data.email)
@@ -19,7 +31,10 @@ async def register_user(user_data: SUserRegister) -> SMessageResponse:
             detail='Пользователь уже существует'
         )
     user_dict = user_data.model_dump()
-    user_dict['password'] = get_password_hash(user_data.password)
+    try:
+        user_dict['password'] = await get_password_hash(user_data.password)
+    except PasswordHasherBusyError as e:
+        raise _hasher_busy(e)
     await UsersDAO.add(**user_dict)
     return SMessageResponse(
         message='Вы успешно зарегистрированы!',
@@ -29,7 +44,10 @@ async def register_user(user_data: SUserRegister) -> SMessageResponse:
 @router.post("/login/")
 async def auth_user(response: Response,
                     user_data: SUserLogin) -> SLoginResponse:
-    check = await authenticate_user(email=user_data.email, password=user_data.password)
+    try:
+        check = await authenticate_user(email=user_data.email, password=user_data.password)
+    except PasswordHasherBusyError as e:
+        raise _hasher_busy(e)
     if check is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail='Неверная почта или пароль')
@@ -39,7 +57,7 @@ async def auth_user(response: Response,
         access_token=access_token,
     )
 
-@router.get("/me/")
+@router.get("/me/", dependencies=[Depends(get_unit_of_work)])
 async def get_me(user_data: User = Depends(get_current_user)) -> SUser:
     return SUser.model_validate(user_data, from_attributes=True)
 
@@ -50,6 +68,8 @@ async def logout_user(response: Response) -> SMessageResponse:
         message='Пользователь успешно вышел из системы',
     )
 
-@router.get("/all_users/")
-async def get_all_users(_: User = Depends(get_current_admin_user)) -> list[SUser]:
-    return await UsersDAO.find_all()
\ No newline at end of file
+@router.get("/all_users/", dependencies=[Depends(get_unit_of_work)])
+async def get_all_users(pagination: SPaginationParams = Depends(get_pagination),
+                        _: User = Depends(get_current_admin_user)) -> SPageResponse[SUser]:
+    users = await UsersDAO.find_all_projected(SUser, pagination=pagination)
+    return SPageResponse.from_projection(users, pagination, SUser)
\ No newline at end of file
@@ -0,0 +1,14 @@
+from app.auth.models import User
+from app.cache import TTLCache
+from app.config import settings
+from app.database import after_commit
+from app.invalidation import invalidation_bus
+
+token_cache: TTLCache[bytes, int] = TTLCache('auth_tokens', settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+user_cache: TTLCache[int, User] = TTLCache('auth_users', settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL_SECONDS)
+invalidation_bus.register(user_cache)
+
+
+def invalidate_user(user_id: int | None = None) -> None:
+    user_ids = [user_id] if user_id is not None else None
+    after_commit(lambda: invalidation_bus.publish(user_cache.name, user_ids))
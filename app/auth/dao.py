@@ -1,3 +1,6 @@
+from typing import Sequence
+
+from app.auth.cache import invalidate_user
 from app.dao.base import BaseDAO
 from app.auth.models import User
 
@@ -5,3 +8,27 @@ from app.auth.models import User
 class UsersDAO(BaseDAO[User]):
     model = User
 
+    @classmethod
+    async def upsert_many(cls, value_dicts: list[dict], update_columns: list[str] | None = None) -> list[tuple]:
+        keys = await super().upsert_many(value_dicts, update_columns)
+        for (user_id,) in keys:
+            invalidate_user(user_id)
+        return keys
+
+    @classmethod
+    async def update(cls, filter_by, **values) -> int:
+        result = await super().update(filter_by, **values)
+        invalidate_user(filter_by.get('id'))
+        return result
+
+    @classmethod
+    async def update_returning(cls, filter_by: dict, columns: Sequence | None = None, **values) -> Sequence:
+        result = await super().update_returning(filter_by, columns, **values)
+        invalidate_user(filter_by.get('id'))
+        return result
+
+    @classmethod
+    async def delete(cls, delete_all: bool = False, **filter_by) -> int:
+        result = await super().delete(delete_all, **filter_by)
+        invalidate_user(filter_by.get('id'))
+        return result
@@ -1,8 +1,10 @@
+import hashlib
 from datetime import datetime, timezone
 
 from fastapi import Request, HTTPException, status, Depends
 from jose import jwt, JWTError
 
+from app.auth.cache import token_cache, user_cache
 from app.auth.dao import UsersDAO
 from app.auth.models import User, Role
 from app.config import settings
@@ -16,7 +18,7 @@ def get_token(request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token not found')
     return token
 
-async def get_current_user(token: str = Depends(get_token)):
+def _verify_token(token: str) -> tuple[int, int]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
@@ -31,11 +33,25 @@ async def get_current_user(token: str = Depends(get_token)):
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Не найден ID пользователя')
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
-    if not user:
+    return int(user_id), int(expire)
+
+async def _load_users(user_ids: list[int]) -> dict[int, User]:
+    user = await UsersDAO.find_one_or_none_by_id(user_ids[0])
+    return {user.id: user} if user else {}
+
+async def get_current_user(token: str = Depends(get_token)):
+    # Verified tokens are cached by digest, never past their own exp, so a hit skips the signature check.
+    digest = hashlib.sha256(token.encode()).digest()
+    user_id = token_cache.get(digest)
+    if user_id is None:
+        user_id, expire = _verify_token(token)
+        token_cache.set(digest, user_id, expires_at=expire)
+
+    users = await user_cache.get_many([user_id], _load_users)
+    if user_id not in users:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
 
-    return user
+    return users[user_id]
 
 async def get_current_admin_user(current_user: User = Depends(get_current_user)):
     if current_user.role == Role.ADMIN:
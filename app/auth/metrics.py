@@ -0,0 +1,10 @@
+from app.metrics import Counter, Gauge
+
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    'password_hash_in_flight',
+    'Password hashing jobs running or queued in the thread pool',
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total',
+    'Password hashing jobs rejected because the queue was full',
+)
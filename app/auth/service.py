@@ -1,23 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Callable
 
 from jose import jwt
 from passlib.context import CryptContext
 from pydantic import EmailStr
 
 from app.auth.dao import UsersDAO
+from app.auth.metrics import PASSWORD_HASH_IN_FLIGHT, PASSWORD_HASH_REJECTED
 from app.auth.models import User
 from app.config import settings
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop.
+# Jobs running plus jobs queued are capped; past the cap callers get PasswordHasherBusyError.
+_password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                                        thread_name_prefix='password-hash')
+_password_jobs_limit = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_LIMIT
+_password_jobs_lock = threading.Lock()
+_password_jobs = 0
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
 
+class PasswordHasherBusyError(Exception):
+    pass
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+def _release_password_slot(_: Future) -> None:
+    global _password_jobs
+    with _password_jobs_lock:
+        _password_jobs -= 1
+
+
+async def _run_password_job[R](function: Callable[..., R], *args) -> R:
+    global _password_jobs
+    with _password_jobs_lock:
+        if _password_jobs >= _password_jobs_limit:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusyError('Too many password hashing jobs in progress')
+        _password_jobs += 1
+    # The slot is released when the thread finishes, even if the awaiting request was cancelled.
+    future = _password_executor.submit(function, *args)
+    future.add_done_callback(_release_password_slot)
+    return await asyncio.wrap_future(future)
+
+
+PASSWORD_HASH_IN_FLIGHT.set_function(lambda: {(): _password_jobs})
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(pwd_context.verify, plain_password, hashed_password)
 
 
 def create_access_token(data: dict) -> str:
@@ -30,6 +69,6 @@ def create_access_token(data: dict) -> str:
 
 async def authenticate_user(email: EmailStr, password: str) -> User | None:
     user = await UsersDAO.find_one_or_none(email=email)
-    if not user or verify_password(plain_password=password, hashed_password=user.password) is False:
+    if not user or await verify_password(plain_password=password, hashed_password=user.password) is False:
         return None
     return user
\ No newline at end of file
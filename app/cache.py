@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Iterable, Sequence
+
+from app.metrics import Counter, Gauge
+
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total',
+    'Cache lookups by outcome',
+    ['cache', 'result'],
+)
+CACHE_EVICTIONS = Counter(
+    'cache_evictions_total',
+    'Entries dropped to stay within the size limit',
+    ['cache'],
+)
+CACHE_INVALIDATIONS = Counter(
+    'cache_invalidations_total',
+    'Entries removed because the data behind them changed',
+    ['cache'],
+)
+CACHE_ENTRIES = Gauge(
+    'cache_entries',
+    'Entries currently held',
+    ['cache'],
+)
+
+_caches: list["TTLCache"] = []
+CACHE_ENTRIES.set_function(lambda: {(cache.name,): len(cache) for cache in _caches})
+
+
+class TTLCache[K: Hashable, V]:
+    """
+    Bounded LRU cache whose entries also expire: after ``ttl`` seconds or at an explicit
+    ``expires_at`` (a ``time.time()`` timestamp), whichever comes first.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._generation = 0
+        _caches.append(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.time():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            CACHE_LOOKUPS.inc(self.name, 'miss')
+            return None
+        CACHE_LOOKUPS.inc(self.name, 'hit')
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def get_many(self,
+                       keys: Sequence[K],
+                       load: Callable[[list[K]], Awaitable[dict[K, V]]]) -> dict[K, V]:
+        """
+        Read-through lookup: keys that are not cached are passed to ``load`` in one call.
+        Loaded values are kept only if nothing was invalidated while ``load`` ran, since
+        the query may have read rows as they were before that change committed.
+        """
+        found: dict[K, V] = {}
+        missing: list[K] = []
+        for key in keys:
+            value = self.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            generation = self._generation
+            loaded = await load(missing)
+            if generation == self._generation:
+                for key, value in loaded.items():
+                    self.set(key, value)
+            found.update(loaded)
+        return found
+
+    def set(self, key: K, value: V, expires_at: float | None = None) -> None:
+        deadline = time.time() + self._ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        self._entries[key] = (deadline, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(self.name)
+
+    def pop(self, key: K) -> None:
+        self.pop_many((key,))
+
+    def pop_many(self, keys: Iterable[K]) -> None:
+        self._generation += 1
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                CACHE_INVALIDATIONS.inc(self.name)
+
+    def clear(self) -> None:
+        self._generation += 1
+        CACHE_INVALIDATIONS.inc(self.name, amount=len(self._entries))
+        self._entries.clear()
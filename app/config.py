@@ -1,4 +1,6 @@
 import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,12 +9,53 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_USER: str
     DB_PASSWORD: str
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 30 * 60
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    EXPORT_CHUNK_SIZE: int = 1000
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 5 * 60
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+
+    CATALOG_CACHE_SIZE: int = 10000
+    CATALOG_CACHE_TTL_SECONDS: int = 10 * 60
+    CACHE_INVALIDATION_BUS: Literal['kafka', 'loopback'] = 'kafka'
+    CACHE_INVALIDATION_TOPIC: str = 'cache_invalidations'
+    CACHE_INVALIDATION_LINGER_MS: int = 20
+    CACHE_INVALIDATION_RETENTION_MS: int = 60 * 60 * 1000
 
     KAFKA_HOST: str
     KAFKA_PORT: int
+    KAFKA_NUM_PARTITIONS: int = 1
+    KAFKA_REPLICATION_FACTOR: int = 1
+    KAFKA_TOPIC_PARTITIONS: dict[str, int] = {}
+    KAFKA_BATCH_MAX_RECORDS: int = 500
+    KAFKA_BATCH_LINGER_MS: int = 100
+    KAFKA_MAX_IN_FLIGHT: int = 64
+    KAFKA_FAST_CODEC: bool = True
+    KAFKA_PRODUCER_LINGER_MS: int = 5
+    KAFKA_PRODUCER_MAX_BATCH_SIZE: int = 64 * 1024
+    KAFKA_PRODUCER_COMPRESSION: str | None = "gzip"
+    KAFKA_PRODUCER_MAX_RETRIES: int = 3
+    KAFKA_PRODUCER_RETRY_BACKOFF_MS: int = 500
+    KAFKA_OUTBOX_BATCH_SIZE: int = 500
+    KAFKA_OUTBOX_POLL_INTERVAL_MS: int = 200
+    KAFKA_OUTBOX_DELIVERY_TIMEOUT_MS: int = 5000
+    KAFKA_RETRY_MAX_ATTEMPTS: int = 5
+    KAFKA_RETRY_BACKOFF_MS: int = 1000
+    KAFKA_RETRY_MAX_BACKOFF_MS: int = 5 * 60 * 1000
+    KAFKA_RETRY_BACKOFF_MS_BY_TOPIC: dict[str, int] = {}
 
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"),
@@ -25,6 +68,12 @@ def get_db_url() -> str:
     return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@"
             f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
 
+def get_db_replica_url() -> str | None:
+    if not settings.DB_REPLICA_HOST:
+        return None
+    return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@"
+            f"{settings.DB_REPLICA_HOST}:{settings.DB_REPLICA_PORT or settings.DB_PORT}/{settings.DB_NAME}")
+
 def get_kafka_url() -> str:
     return f"{settings.KAFKA_HOST}:{settings.KAFKA_PORT}"
 
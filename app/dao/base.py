@@ -1,96 +1,220 @@
-from typing import Sequence, Optional
+from typing import Any, AsyncIterator, Iterator, Mapping, Sequence, Optional
 
-from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete
-from app.database import async_session_maker
+from sqlalchemy import Select, ColumnElement, update as sqlalchemy_update, delete as sqlalchemy_delete, case, func
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import BaseModel
+from app.config import settings
+from app.database import read_session, replica_session, stream_session, write_session
+from app.schemas import SPaginationParams
+
+
+# asyncpg refuses statements with more bind parameters than this
+_MAX_BIND_PARAMS = 32767
+
+
+def bind_param_chunks[R](rows: Sequence[R],
+                         params_per_row: int,
+                         fixed_params: int = 0) -> Iterator[Sequence[R]]:
+    """
+    Slices of ``rows`` small enough for one multi-row statement binding ``params_per_row``
+    parameters per row plus ``fixed_params`` once for the whole statement.
+    """
+    chunk_size = max(1, (_MAX_BIND_PARAMS - fixed_params) // params_per_row)
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def ilike_contains(column: ColumnElement[str], value: str) -> ColumnElement[bool]:
+    """
+    Plain ``column ILIKE '%value%'``, unlike ``icontains`` it does not wrap the column in
+    ``lower()`` and can therefore use a trigram index on it.
+    """
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return column.ilike(f'%{escaped}%', escape='\\')
+
+
+def newer_snapshot[V](column: ColumnElement[V],
+                      value: ColumnElement[V],
+                      snapshot_at_column: ColumnElement[int],
+                      snapshot_at: ColumnElement[int]) -> dict[str, ColumnElement]:
+    """
+    UPDATE values for a last-write-wins snapshot: ``column`` takes ``value`` unless the row
+    already holds a snapshot taken later, and ``snapshot_at_column`` keeps the latest time.
+    """
+    return {
+        column.key: case(
+            (func.coalesce(snapshot_at_column, snapshot_at) <= snapshot_at, value),
+            else_=column,
+        ),
+        snapshot_at_column.key: func.greatest(snapshot_at_column, snapshot_at),
+    }
 
 
 class BaseDAO[T]:
     model: T = None
 
     @classmethod
-    async def find_all(cls) -> Sequence[T]:
-        async with async_session_maker() as session:
-            query = select(cls.model)
+    def paginate(cls, query: Select, pagination: SPaginationParams | None) -> Select:
+        """
+        Keyset pagination by id: fetches one row past the page so the caller can tell
+        whether there is a next page without a separate count query.
+        """
+        if pagination is None:
+            return query
+        if pagination.after_id is not None:
+            query = query.where(cls.model.id > pagination.after_id)
+        return query.order_by(cls.model.id).limit(pagination.page_size + 1)
+
+    @classmethod
+    async def stream(cls, query: Select) -> AsyncIterator[Sequence[T]]:
+        """
+        Yields the rows of ``query`` in chunks of EXPORT_CHUNK_SIZE through a server-side cursor,
+        detaching every chunk once it is handed out so memory stays flat at any result size.
+        """
+        async with stream_session() as session:
+            result = await session.stream_scalars(
+                query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+            )
+            async for chunk in result.partitions():
+                yield chunk
+                session.expunge_all()
+
+    @classmethod
+    def _filter(cls, query: Select, filters: Any) -> Select:
+        raise TypeError(f'{cls.__name__} does not support filters')
+
+    @classmethod
+    def project(cls, schema: type[BaseModel]) -> Select:
+        """
+        SELECT of just the model columns named like the fields of ``schema``, plus the id
+        pagination needs, so rows can be validated into the schema without an ORM entity.
+        """
+        columns = [getattr(cls.model, name) for name in schema.model_fields]
+        if 'id' not in schema.model_fields:
+            columns.append(cls.model.id)
+        return select(*columns)
+
+    @classmethod
+    async def find_all_projected(cls,
+                                 schema: type[BaseModel],
+                                 filters: Any = None,
+                                 pagination: SPaginationParams | None = None) -> Sequence[Mapping[str, Any]]:
+        async with replica_session() as session:
+            query = cls.project(schema)
+            if filters is not None:
+                query = cls._filter(query, filters)
+            result = await session.execute(cls.paginate(query, pagination))
+            return result.mappings().all()
+
+    @classmethod
+    async def find_all(cls, pagination: SPaginationParams | None = None) -> Sequence[T]:
+        async with replica_session() as session:
+            query = cls.paginate(select(cls.model), pagination)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
     async def find_one_or_none_by_id(cls, data_id: int) -> Optional[T]:
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(id=data_id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
     async def find_one_or_none(cls, **filter_by) -> Optional[T]:
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
     async def add(cls, **values) -> T:
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_instance = cls.model(**values)
-                session.add(new_instance)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instance
+        async with write_session() as session:
+            new_instance = cls.model(**values)
+            session.add(new_instance)
+            return new_instance
 
     @classmethod
     async def add_all(cls, *value_dicts) -> T:
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_instances = [
-                    cls.model(**value_dict)
-                    for value_dict in value_dicts
-                ]
-                session.add_all(new_instances)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instances
+        async with write_session() as session:
+            new_instances = [
+                cls.model(**value_dict)
+                for value_dict in value_dicts
+            ]
+            session.add_all(new_instances)
+            return new_instances
 
     @classmethod
-    async def update(cls, filter_by, **values) -> int:
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = (
-                    sqlalchemy_update(cls.model)
-                    .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
-                    .values(**values)
-                    .execution_options(synchronize_session="fetch")
-                )
+    async def upsert_many(cls,
+                          value_dicts: list[dict],
+                          update_columns: list[str] | None = None) -> list[tuple]:
+        """
+        Inserts rows with multi-row ``INSERT ... ON CONFLICT (primary key) DO UPDATE`` statements,
+        chunked to fit the bind parameter limit, and returns the primary keys of every
+        inserted or updated row. Rows repeating a key are collapsed, the last one wins.
+        By default every non-key column present in the rows is updated on conflict.
+        """
+        if not value_dicts:
+            return []
+        key_columns = [column.name for column in cls.model.__table__.primary_key]
+        rows = list({tuple(row[key] for key in key_columns): row for row in value_dicts}.values())
+        if update_columns is None:
+            update_columns = [column for column in rows[0] if column not in key_columns]
+
+        upserted = []
+        async with write_session() as session:
+            for chunk in bind_param_chunks(rows, len(rows[0])):
+                query = insert(cls.model).values(chunk)
+                if update_columns:
+                    query = query.on_conflict_do_update(
+                        index_elements=key_columns,
+                        set_={column: query.excluded[column] for column in update_columns},
+                    )
+                else:
+                    query = query.on_conflict_do_nothing(index_elements=key_columns)
+                query = query.returning(*[getattr(cls.model, key) for key in key_columns])
                 result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+                upserted.extend(tuple(row) for row in result)
+        return upserted
+
+    @classmethod
+    async def update(cls, filter_by, **values) -> int:
+        async with write_session() as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+                .execution_options(synchronize_session="fetch")
+            )
+            result = await session.execute(query)
+            return result.rowcount
+
+    @classmethod
+    async def update_returning(cls, filter_by: dict, columns: Sequence | None = None, **values) -> Sequence:
+        """
+        Updates the rows matching ``filter_by`` and returns them from the same statement,
+        as model instances or, when ``columns`` are given, as rows of just those columns.
+        """
+        async with write_session() as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+                .returning(*(columns or [cls.model]))
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            result = await session.execute(query)
+            return result.all() if columns else result.scalars().all()
 
     @classmethod
     async def delete(cls, delete_all: bool = False, **filter_by) -> int:
         if not delete_all and not filter_by:
             raise ValueError("Необходимо указать хотя бы один параметр для удаления.")
 
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with write_session() as session:
+            query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+            result = await session.execute(query)
+            return result.rowcount
 
 
@@ -1,16 +1,142 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Annotated, Any
+from typing import Annotated, Any, AsyncIterator, Callable
 
-from sqlalchemy import func
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
+from sqlalchemy import func, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs, AsyncSession, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase, declared_attr, mapped_column, Mapped, class_mapper
-from app.config import get_db_url
+from app.config import get_db_url, get_db_replica_url, settings
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE},
+    )
 
 
 DATABASE_URL = get_db_url()
-engine = create_async_engine(DATABASE_URL)
+engine = _create_engine(DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+REPLICA_DATABASE_URL = get_db_replica_url()
+replica_engine = _create_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+replica_session_maker = async_sessionmaker(replica_engine, expire_on_commit=False) if replica_engine else None
+
+_current_session: ContextVar[AsyncSession | None] = ContextVar('current_session', default=None)
+_primary_pinned: ContextVar[bool] = ContextVar('primary_pinned', default=False)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """
+    Opens one session and one transaction shared by every DAO call made inside it.
+    Commits on exit and rolls everything back if an exception escapes.
+
+    DAO calls inside it still hand out detached objects, exactly as they do on their own.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+    async with async_session_maker() as session:
+        async with session.begin():
+            token = _current_session.set(session)
+            pinned = _primary_pinned.set(False)
+            try:
+                yield session
+            finally:
+                _primary_pinned.reset(pinned)
+                _current_session.reset(token)
+        for callback in session.info.pop('after_commit', ()):
+            callback()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Runs ``callback`` once the current unit of work has committed, or right away outside of one,
+    where every write_session has already committed by the time its DAO call returns.
+    Callbacks of a unit of work that is rolled back never run.
+    """
+    session = _current_session.get()
+    if session is None:
+        callback()
+        return
+    session.info.setdefault('after_commit', []).append(callback)
+
+
+async def get_unit_of_work() -> AsyncIterator[AsyncSession]:
+    async with unit_of_work() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        session.expunge_all()
+        return
+    async with async_session_maker() as session:
+        yield session
+
+
+@asynccontextmanager
+async def replica_session() -> AsyncIterator[AsyncSession]:
+    """
+    Session for read-only queries that tolerate replication lag. Falls back to the primary
+    when no replica is configured or once the current request or job has written something,
+    so it always reads its own writes.
+    """
+    if replica_session_maker is None or _primary_pinned.get():
+        async with read_session() as session:
+            yield session
+        return
+    async with replica_session_maker() as session:
+        yield session
+
+
+@asynccontextmanager
+async def stream_session() -> AsyncIterator[AsyncSession]:
+    """
+    Dedicated session for server-side cursors. Streamed responses outlive the request's unit
+    of work, so this never reuses it and prefers the replica when one is configured.
+    """
+    async with (replica_session_maker or async_session_maker)() as session:
+        yield session
+
+
+@asynccontextmanager
+async def write_session() -> AsyncIterator[AsyncSession]:
+    # Inside a unit of work the pin lasts until it ends; a standalone write only pins itself.
+    session = _current_session.get()
+    if session is not None:
+        _primary_pinned.set(True)
+        yield session
+        await session.flush()
+        session.expunge_all()
+        return
+    pinned = _primary_pinned.set(True)
+    try:
+        async with async_session_maker() as session, session.begin():
+            yield session
+    finally:
+        _primary_pinned.reset(pinned)
+
+
+def is_pool_saturated() -> bool:
+    pool = engine.pool
+    # max_overflow=-1 lets the pool open as many connections as asked for, so it never fills up.
+    if not isinstance(pool, QueuePool) or settings.DB_MAX_OVERFLOW < 0:
+        return False
+    return pool.checkedout() >= settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
 
 int_pk = Annotated[int, mapped_column(primary_key=True)]
 created_at = Annotated[datetime, mapped_column(server_default=func.now())]
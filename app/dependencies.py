@@ -0,0 +1,9 @@
+from typing import Annotated
+
+from fastapi import Query
+
+from app.schemas import SPaginationParams
+
+
+def get_pagination(pagination: Annotated[SPaginationParams, Query()]) -> SPaginationParams:
+    return pagination
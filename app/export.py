@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Sequence
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+class ExportFormat(str, Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+_MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+async def _ndjson_chunks(chunks: AsyncIterator[Sequence[Any]],
+                         convert: Callable[[Any], BaseModel]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield ''.join(convert(row).model_dump_json() + '\n' for row in chunk).encode('utf-8')
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def _csv_chunks(chunks: AsyncIterator[Sequence[Any]],
+                      convert: Callable[[Any], BaseModel],
+                      fields: list[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode('utf-8')
+    async for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            data = convert(row).model_dump(mode='json')
+            writer.writerow([_csv_cell(data[field]) for field in fields])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def export_response(chunks: AsyncIterator[Sequence[Any]],
+                    schema: type[BaseModel],
+                    export_format: ExportFormat,
+                    filename: str,
+                    convert: Callable[[Any], BaseModel] | None = None) -> StreamingResponse:
+    if convert is None:
+        convert = lambda row: schema.model_validate(row, from_attributes=True)
+    if export_format == ExportFormat.CSV:
+        body = _csv_chunks(chunks, convert, list(schema.model_fields))
+    else:
+        body = _ndjson_chunks(chunks, convert)
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format.value}"'},
+    )
@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from app.cache import TTLCache
+from app.config import settings
+
+# Changed ids per cache name; None stands for every entry of that cache.
+InvalidationKeys = dict[str, list[int] | None]
+
+
+class InvalidationBus(ABC):
+    """
+    Carries cache invalidations to every replica of the application. ``publish`` drops the
+    entries from this process's caches right away and hands the keys to ``_broadcast``,
+    which subclasses implement to reach the other replicas.
+    """
+
+    def __init__(self) -> None:
+        self._caches: dict[str, TTLCache] = {}
+
+    def register(self, cache: TTLCache) -> None:
+        self._caches[cache.name] = cache
+
+    def publish(self, cache_name: str, keys: Iterable[int] | None = None) -> None:
+        invalidation = {cache_name: list(keys) if keys is not None else None}
+        self._apply(invalidation)
+        self._broadcast(invalidation)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _apply(self, invalidation: InvalidationKeys) -> None:
+        for cache_name, keys in invalidation.items():
+            cache = self._caches.get(cache_name)
+            if cache is None:
+                continue
+            if keys is None:
+                cache.clear()
+            else:
+                cache.pop_many(keys)
+
+    @abstractmethod
+    def _broadcast(self, invalidation: InvalidationKeys) -> None:
+        ...
+
+
+class LoopbackInvalidationBus(InvalidationBus):
+    """
+    In-process stand-in for the broadcast channel. Buses created with the same ``peers``
+    list deliver to each other the way replicas would, so tests can run several side by side;
+    alone it is all a single-process deployment needs.
+    """
+
+    def __init__(self, peers: list["LoopbackInvalidationBus"] | None = None) -> None:
+        super().__init__()
+        self._peers = peers if peers is not None else []
+        self._peers.append(self)
+
+    def _broadcast(self, invalidation: InvalidationKeys) -> None:
+        for peer in self._peers:
+            if peer is not self:
+                peer._apply(invalidation)
+
+
+def _create_bus() -> InvalidationBus:
+    if settings.CACHE_INVALIDATION_BUS == 'kafka':
+        from app.kafka.invalidation import KafkaInvalidationBus
+        from app.kafka.producers import kafka_producer
+        return KafkaInvalidationBus(kafka_producer)
+    return LoopbackInvalidationBus()
+
+
+invalidation_bus = _create_bus()
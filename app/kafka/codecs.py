@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+from typing import Any, Protocol
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class KafkaCodec[T: BaseModel](Protocol):
+    def decode(self, value: bytes) -> T:
+        ...
+
+    def encode(self, event: T) -> bytes:
+        ...
+
+
+class JsonCodec[T: BaseModel]:
+    """
+    Reference codec: bytes -> str -> dict -> model on the way in,
+    model -> dict -> str -> bytes on the way out.
+    """
+
+    def __init__(self, model: type[T]) -> None:
+        self._model = model
+
+    def decode(self, value: bytes) -> T:
+        return self._model.model_validate(json.loads(value.decode("utf-8")))
+
+    def encode(self, event: T) -> bytes:
+        def default_serializer(obj: Any) -> Any:
+            if isinstance(obj, UUID):
+                return str(obj)
+            if isinstance(obj, datetime):
+                return obj.isoformat()
+            raise TypeError(f"Type {type(obj)} not serializable")
+
+        return json.dumps(
+            event.model_dump(exclude_none=True, exclude_unset=True),
+            default=default_serializer
+        ).encode("utf-8")
+
+
+class PydanticJsonCodec[T: BaseModel]:
+    """
+    Validates straight from bytes and serializes straight to bytes with pydantic-core,
+    without intermediate dicts or strings.
+    """
+
+    def __init__(self, model: type[T]) -> None:
+        self._model = model
+
+    def decode(self, value: bytes) -> T:
+        return self._model.model_validate_json(value)
+
+    def encode(self, event: T) -> bytes:
+        return event.__pydantic_serializer__.to_json(event, exclude_none=True, exclude_unset=True)
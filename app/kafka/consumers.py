@@ -1,86 +1,339 @@
 import asyncio
-import json
+import time
 from asyncio import AbstractEventLoop, Task
+from collections import defaultdict
+from functools import partial
 from typing import Callable, Dict, Coroutine, Any
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition, ConsumerRebalanceListener
+from aiokafka.errors import KafkaError
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.config import get_kafka_url
+from app.config import get_kafka_url, settings
+from app.database import unit_of_work
+from app.kafka.codecs import KafkaCodec, JsonCodec, PydanticJsonCodec
+from app.kafka.dao import ProcessedMessageDAO
+from app.kafka.dispatcher import KafkaDispatcher
+from app.kafka.metrics import (
+    CONSUMER_MESSAGES,
+    CONSUMER_ERRORS,
+    CONSUMER_HANDLER_SECONDS,
+    CONSUMER_LAG,
+    CONSUMER_IN_FLIGHT,
+)
+from app.kafka.offsets import OffsetTracker
+from app.kafka.retry import RetryScheduler, retry_at, original_timestamp
 from app.kafka.schemas import KafkaNewSupplierPrice, KafkaNewProductAvailable, KafkaNewOrderSupplierStatus
-from app.orders.services import update_supplier_order_status
-from app.products.service import update_available_stock
-from app.suppliers.service import update_supplier_product_price
+from app.kafka.topics import retry_topic, source_topic, RETRY_SUFFIX
+from app.orders.services import update_supplier_order_statuses
+from app.products.service import update_available_stocks
+from app.suppliers.service import update_supplier_product_prices
+
+# Handlers get (key, event, original record timestamp in ms) and return an error or None per message
+BatchHandler = Callable[[list[tuple[str, Any, int]]], Coroutine[Any, Any, list[Exception | None]]]
+
+
+def default_codec[T: BaseModel](model: type[T]) -> KafkaCodec[T]:
+    if settings.KAFKA_FAST_CODEC:
+        return PydanticJsonCodec(model)
+    return JsonCodec(model)
 
 
 class KafkaConsumer:
-    def __init__(self, loop: AbstractEventLoop) -> None:
+    def __init__(self, loop: AbstractEventLoop, retry: RetryScheduler) -> None:
         self._loop = loop
+        self._retry = retry
         self._consumer = AIOKafkaConsumer(
             bootstrap_servers=get_kafka_url(),
             group_id="fastapi-consumer",
             loop=self._loop,
             auto_offset_reset="earliest",
+            enable_auto_commit=False,
         )
-        self._handlers: Dict[str, Callable[[str, dict[Any, Any]], Coroutine[Any, Any, None]]] = {}
+        self._dispatcher = KafkaDispatcher(self._consumer, settings.KAFKA_MAX_IN_FLIGHT)
+        self._offsets = OffsetTracker()
+        self._ledger: dict[TopicPartition, set[int]] = {}
+        self._batch_handlers: Dict[str, BatchHandler] = {}
+        self._codecs: Dict[str, KafkaCodec] = {}
         self._task: Task[None] | None = None
+        self._closing = False
+        self._revoking: set[TopicPartition] = set()
+        CONSUMER_LAG.set_function(self._lag)
+        CONSUMER_IN_FLIGHT.set_function(lambda: {(): self._dispatcher.in_flight})
 
-    def register_handler(self, topic: str, handler: Callable[[str, dict[Any, Any]], Coroutine[Any, Any, None]]) -> None:
-        self._handlers[topic] = handler
+    def register_batch_handler(self, topic: str, handler: BatchHandler, codec: KafkaCodec) -> None:
+        self._batch_handlers[topic] = handler
+        self._codecs[topic] = codec
 
     async def start(self) -> None:
         await self._consumer.start()
-        self._consumer.subscribe(topics=list(self._handlers.keys()))
+        topics = list(self._batch_handlers.keys())
+        self._consumer.subscribe(
+            topics=[*topics, *map(retry_topic, topics)],
+            listener=_RebalanceListener(self),
+        )
         self._task = asyncio.create_task(self._consume())
 
     async def stop(self) -> None:
+        self._closing = True
         if self._task:
             self._task.cancel()
+            await asyncio.wait([self._task])
+        await self._dispatcher.drain()
+        await self._commit()
         if self._consumer:
             await self._consumer.stop()
 
     async def _consume(self) -> None:
         try:
-            async for msg in self._consumer:
-                topic = msg.topic
-                value = json.loads(msg.value.decode("utf-8"))
-                key = msg.key
-                if isinstance(key, bytes):
-                    key = key.decode("utf-8")
-                handler = self._handlers.get(topic)
-                if handler:
-                    try:
-                        await handler(key, value)
-                    except Exception as e:
-                        print(e)
+            while True:
+                batches = await self._poll_batch()
+                for tp, messages in batches.items():
+                    # A rebalance may have revoked the partition while earlier batches were submitted.
+                    if tp not in self._consumer.assignment():
+                        continue
+                    if tp.topic.endswith(RETRY_SUFFIX):
+                        messages = self._defer_not_due(tp, messages)
+                    if not messages:
+                        continue
+                    for msg in messages:
+                        self._offsets.track(tp, msg.offset)
+                    messages = await self._skip_processed(tp, messages)
+                    if not messages or tp not in self._consumer.assignment():
+                        continue
+                    topic = source_topic(tp.topic)
+                    await self._dispatcher.submit(tp, partial(self._handle_batch, topic, messages))
+                await self._commit()
         except asyncio.CancelledError:
             pass
 
+    async def _poll_batch(self) -> dict[TopicPartition, list[ConsumerRecord]]:
+        batches: dict[TopicPartition, list[ConsumerRecord]] = defaultdict(list)
+        max_records = settings.KAFKA_BATCH_MAX_RECORDS
+        deadline = self._loop.time() + settings.KAFKA_BATCH_LINGER_MS / 1000
+        count = 0
+        while count < max_records:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            records = await self._consumer.getmany(
+                timeout_ms=int(timeout * 1000),
+                max_records=max_records - count,
+            )
+            for tp, messages in records.items():
+                batches[tp].extend(messages)
+                count += len(messages)
+        return batches
+
+    async def _on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        self._revoking |= revoked
+        try:
+            await self._dispatcher.drain()
+            await self._commit()
+        finally:
+            self._revoking -= revoked
+        self._offsets.forget(revoked)
+        for tp in revoked:
+            self._ledger.pop(tp, None)
+
+    def _on_partitions_assigned(self, assigned: set[TopicPartition]) -> None:
+        self._offsets.forget(assigned)
+        for tp in assigned:
+            self._ledger.pop(tp, None)
+
+    def _lag(self) -> dict[tuple[str, ...], float]:
+        lag = {}
+        committed = self._offsets.committed
+        for tp in self._consumer.assignment():
+            highwater = self._consumer.highwater(tp)
+            if highwater is None or tp not in committed:
+                continue
+            lag[(tp.topic, str(tp.partition))] = highwater - committed[tp]
+        return lag
+
+    def _defer_not_due(self, tp: TopicPartition, messages: list[ConsumerRecord]) -> list[ConsumerRecord]:
+        now = self._loop.time()
+        wall_now_ms = int(time.time() * 1000)
+        for i, msg in enumerate(messages):
+            delay_ms = retry_at(msg) - wall_now_ms
+            if delay_ms > 0:
+                self._consumer.seek(tp, msg.offset)
+                self._consumer.pause(tp)
+                self._loop.call_at(now + delay_ms / 1000, self._resume, tp)
+                return messages[:i]
+        return messages
+
+    def _resume(self, tp: TopicPartition) -> None:
+        if tp in self._consumer.assignment():
+            self._consumer.resume(tp)
+
+    async def _skip_processed(self, tp: TopicPartition, messages: list[ConsumerRecord]) -> list[ConsumerRecord]:
+        window = self._ledger.get(tp)
+        if window is None:
+            window = await ProcessedMessageDAO.find_offsets(tp.topic, tp.partition, messages[0].offset)
+            self._ledger[tp] = window
+        if not window:
+            return messages
+        fresh = []
+        for msg in messages:
+            if msg.offset in window:
+                self._offsets.done(tp, msg.offset)
+            else:
+                fresh.append(msg)
+        if messages[-1].offset >= max(window):
+            window.clear()
+        return fresh
+
+    async def _commit(self) -> None:
+        # Ledger rows are written by the handlers themselves; once Kafka has the offsets,
+        # nothing below them can be redelivered and their rows are no longer needed.
+        try:
+            offsets = self._offsets.committable(self._consumer.assignment())
+            if offsets:
+                await self._consumer.commit(offsets)
+                self._offsets.mark_committed(offsets)
+                await ProcessedMessageDAO.delete_below({
+                    (tp.topic, tp.partition): offset
+                    for tp, offset in offsets.items()
+                })
+        except (KafkaError, SQLAlchemyError) as e:
+            print(e)
+
+    async def _handle_batch(self, topic: str, messages: list[ConsumerRecord]) -> None:
+        handler = self._batch_handlers[topic]
+        decoded = []
+        decoded_messages = []
+        for msg in messages:
+            try:
+                decoded.append((*self._decode(msg), original_timestamp(msg)))
+                decoded_messages.append(msg)
+            except Exception as e:
+                await self._complete(msg, e)
+        if not decoded:
+            return
+        started = time.perf_counter()
+        try:
+            # The ledger rows commit in the same transaction as the handler's changes, so a
+            # message whose changes are committed is always recognised when it is redelivered.
+            async with unit_of_work():
+                errors = await handler(decoded)
+                await ProcessedMessageDAO.add_offsets([
+                    (msg.topic, msg.partition, msg.offset)
+                    for msg, error in zip(decoded_messages, errors)
+                    if error is None
+                ])
+        except Exception as e:
+            errors = [e] * len(decoded)
+        CONSUMER_HANDLER_SECONDS.observe(time.perf_counter() - started, decoded_messages[0].topic)
+        await asyncio.gather(*[
+            self._complete(msg, error)
+            for msg, error in zip(decoded_messages, errors)
+        ])
+
+    def _decode(self, msg: ConsumerRecord) -> tuple[str, Any]:
+        key = msg.key
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        return key, self._codecs[source_topic(msg.topic)].decode(msg.value)
+
+    async def _complete(self, msg: ConsumerRecord, error: Exception | None = None) -> None:
+        CONSUMER_MESSAGES.inc(msg.topic)
+        tp = TopicPartition(msg.topic, msg.partition)
+        if error is not None:
+            CONSUMER_ERRORS.inc(msg.topic)
+            print(f"{msg.topic}[{msg.partition}]@{msg.offset}: {error!r}")
+            if not await self._schedule_retry(tp, msg, error):
+                # The offset stays uncommitted, so the message is redelivered instead of lost.
+                return
+        self._offsets.done(tp, msg.offset)
+
+    async def _schedule_retry(self, tp: TopicPartition, msg: ConsumerRecord, error: Exception) -> bool:
+        """
+        Keeps the partition's lane busy until the message is on its retry or dead-letter topic.
+        Gives up only when the partition is being revoked or the consumer is stopping.
+        """
+        while True:
+            try:
+                await self._retry.schedule(msg, error)
+                return True
+            except Exception as e:
+                print(f"{msg.topic}[{msg.partition}]@{msg.offset}: failed to schedule retry: {e!r}")
+            if self._closing or tp in self._revoking:
+                return False
+            await asyncio.sleep(settings.KAFKA_RETRY_BACKOFF_MS / 1000)
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, kafka: KafkaConsumer) -> None:
+        self._kafka = kafka
+
+    async def on_partitions_revoked(self, revoked: list[TopicPartition]) -> None:
+        await self._kafka._on_partitions_revoked(set(revoked))
+
+    async def on_partitions_assigned(self, assigned: list[TopicPartition]) -> None:
+        self._kafka._on_partitions_assigned(set(assigned))
+
 
 class PriceConsumer:
     def __init__(self, kafka: KafkaConsumer):
         self._kafka = kafka
-        self._kafka.register_handler("supplier_price_updates", self.handle_price_update)
+        self._kafka.register_batch_handler(
+            "supplier_price_updates",
+            self.handle_price_updates,
+            codec=default_codec(KafkaNewSupplierPrice),
+        )
 
-    async def handle_price_update(self, _: str, data: dict) -> None:
-        price_event = KafkaNewSupplierPrice.model_validate(data)
-        await update_supplier_product_price(price_event)
+    async def handle_price_updates(
+            self,
+            messages: list[tuple[str, KafkaNewSupplierPrice, int]]
+    ) -> list[Exception | None]:
+        # Prices are snapshots too: the record timestamps keep a retried older price from
+        # overwriting a newer one applied in the meantime.
+        return await update_supplier_product_prices([
+            (price_event, timestamp) for _, price_event, timestamp in messages
+        ])
 
 
 class StockConsumer:
     def __init__(self, kafka: KafkaConsumer):
         self._kafka = kafka
-        self._kafka.register_handler("product_remaining_stock_updates", self.handle_stock_update)
+        self._kafka.register_batch_handler(
+            "product_remaining_stock_updates",
+            self.handle_stock_updates,
+            codec=default_codec(KafkaNewProductAvailable),
+        )
 
-    async def handle_stock_update(self, _: str, data: dict) -> None:
-        stock_event = KafkaNewProductAvailable.model_validate(data)
-        await update_available_stock(stock_event)
+    async def handle_stock_updates(
+            self,
+            messages: list[tuple[str, KafkaNewProductAvailable, int]]
+    ) -> list[Exception | None]:
+        # Stock messages are full snapshots, so only the latest one per product in the poll batch is
+        # written, and only if no later snapshot of it was applied, say while this one waited for a retry.
+        stocks: dict[int, tuple[int, int]] = {}
+        for _, stock_event, timestamp in messages:
+            latest = stocks.get(stock_event.product_id)
+            if latest is None or latest[1] <= timestamp:
+                stocks[stock_event.product_id] = (stock_event.available, timestamp)
+        updated = await update_available_stocks(stocks)
+        return [
+            None if stock_event.product_id in updated
+            else ValueError('Something went wrong with updating available stock', stock_event.model_dump())
+            for _, stock_event, _ in messages
+        ]
 
 
 class OrderConsumer:
     def __init__(self, kafka: KafkaConsumer):
         self._kafka = kafka
-        self._kafka.register_handler("supplier_order_updates", self.handle_order_status_update)
+        self._kafka.register_batch_handler(
+            "supplier_order_updates",
+            self.handle_order_status_updates,
+            codec=default_codec(KafkaNewOrderSupplierStatus),
+        )
 
-    async def handle_order_status_update(self, key: str, data: dict) -> None:
-        order_event = KafkaNewOrderSupplierStatus.model_validate(data)
-        await update_supplier_order_status(order_event)
+    async def handle_order_status_updates(
+            self,
+            messages: list[tuple[str, KafkaNewOrderSupplierStatus, int]]
+    ) -> list[Exception | None]:
+        return await update_supplier_order_statuses([order_event for _, order_event, _ in messages])
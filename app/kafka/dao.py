@@ -0,0 +1,89 @@
+from typing import Callable, Coroutine, Any, Sequence
+
+from sqlalchemy import select, delete as sqlalchemy_delete, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.dao.base import BaseDAO
+from app.database import read_session, write_session
+from app.kafka.models import ProcessedMessage, OutboxEvent
+
+
+class ProcessedMessageDAO(BaseDAO[ProcessedMessage]):
+    model = ProcessedMessage
+
+    @classmethod
+    async def find_offsets(cls, topic: str, partition: int, from_offset: int) -> set[int]:
+        async with read_session() as session:
+            query = (
+                select(cls.model.offset)
+                .where(
+                    cls.model.topic == topic,
+                    cls.model.partition == partition,
+                    cls.model.offset >= from_offset,
+                )
+            )
+            result = await session.execute(query)
+            return set(result.scalars().all())
+
+    @classmethod
+    async def add_offsets(cls, offsets: list[tuple[str, int, int]]) -> None:
+        if not offsets:
+            return
+        async with write_session() as session:
+            query = (
+                insert(cls.model)
+                .values([
+                    {'topic': topic, 'partition': partition, 'offset': offset}
+                    for topic, partition, offset in offsets
+                ])
+                .on_conflict_do_nothing()
+            )
+            await session.execute(query)
+
+    @classmethod
+    async def delete_below(cls, watermarks: dict[tuple[str, int], int]) -> int:
+        if not watermarks:
+            return 0
+        async with write_session() as session:
+            query = (
+                sqlalchemy_delete(cls.model)
+                .where(or_(*[
+                    and_(
+                        cls.model.topic == topic,
+                        cls.model.partition == partition,
+                        cls.model.offset < offset,
+                    )
+                    for (topic, partition), offset in watermarks.items()
+                ]))
+            )
+            result = await session.execute(query)
+            return result.rowcount
+
+
+class OutboxDAO(BaseDAO[OutboxEvent]):
+    model = OutboxEvent
+
+    @classmethod
+    async def relay_batch(
+            cls,
+            limit: int,
+            publish: Callable[[Sequence[OutboxEvent]], Coroutine[Any, Any, set[int]]]
+    ) -> int:
+        async with write_session() as session:
+            query = (
+                select(cls.model)
+                .order_by(cls.model.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(query)
+            events = result.scalars().all()
+            if not events:
+                return 0
+            published = await publish(events)
+            if published:
+                await session.execute(
+                    sqlalchemy_delete(cls.model)
+                    .where(cls.model.id.in_(published))
+                )
+            return len(events)
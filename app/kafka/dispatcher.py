@@ -0,0 +1,83 @@
+import asyncio
+from asyncio import Task
+from typing import Callable, Coroutine, Any, Hashable
+
+from aiokafka import AIOKafkaConsumer
+
+from app.database import is_pool_saturated
+
+Job = Callable[[], Coroutine[Any, Any, None]]
+
+
+class KafkaDispatcher:
+    """
+    Runs consumer jobs concurrently with a bounded number of jobs in flight.
+
+    Jobs submitted to the same lane run strictly one after another in submission order,
+    jobs from different lanes run in parallel. While the in-flight limit or the database
+    pool is saturated, all assigned partitions are paused so the fetcher stops buffering.
+    Only the partitions paused here are resumed afterwards; partitions paused by someone
+    else, such as retry partitions waiting for their due time, stay paused.
+    """
+
+    _SATURATION_CHECK_INTERVAL = 0.05
+
+    def __init__(self, consumer: AIOKafkaConsumer, max_in_flight: int) -> None:
+        self._consumer = consumer
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._lanes: dict[Hashable, Task[None]] = {}
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def submit(self, lane: Hashable, job: Job) -> None:
+        await self._wait_for_capacity()
+        self._in_flight += 1
+        if self._in_flight >= self._max_in_flight:
+            self._capacity.clear()
+        previous = self._lanes.get(lane)
+        task = asyncio.create_task(self._run(previous, job))
+        self._lanes[lane] = task
+        task.add_done_callback(lambda t: self._release(lane, t))
+
+    async def drain(self) -> None:
+        tasks = list(self._lanes.values())
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def _saturated(self) -> bool:
+        return self._in_flight >= self._max_in_flight or is_pool_saturated()
+
+    async def _wait_for_capacity(self) -> None:
+        if not self._saturated():
+            return
+        paused = self._consumer.assignment() - self._consumer.paused()
+        self._consumer.pause(*paused)
+        try:
+            while self._saturated():
+                try:
+                    await asyncio.wait_for(self._capacity.wait(), timeout=self._SATURATION_CHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._consumer.resume(*(paused & self._consumer.assignment()))
+
+    @staticmethod
+    async def _run(previous: Task[None] | None, job: Job) -> None:
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+        try:
+            await job()
+        except Exception as e:
+            print(e)
+
+    def _release(self, lane: Hashable, task: Task[None]) -> None:
+        self._in_flight -= 1
+        if self._in_flight < self._max_in_flight:
+            self._capacity.set()
+        if self._lanes.get(lane) is task:
+            del self._lanes[lane]
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import socket
+import uuid
+from asyncio import Task
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.errors import KafkaError
+from pydantic import ValidationError
+
+from app.config import get_kafka_url, settings
+from app.invalidation import InvalidationBus, InvalidationKeys
+from app.kafka.metrics import INVALIDATION_MESSAGES
+from app.kafka.producers import KafkaProducer
+from app.kafka.schemas import KafkaCacheInvalidation
+
+
+class KafkaInvalidationBus(InvalidationBus):
+    """
+    Broadcasts invalidations through a topic that every replica reads from its end: the
+    consumer has no group, so unlike the shared ``fastapi-consumer`` group each process gets
+    every message and there are no offsets to commit. Invalidations published within
+    CACHE_INVALIDATION_LINGER_MS go out as one message; nobody reads old ones, so the topic
+    only keeps them for CACHE_INVALIDATION_RETENTION_MS.
+    """
+
+    def __init__(self, producer: KafkaProducer) -> None:
+        super().__init__()
+        self._producer = producer
+        self._instance_id = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._consumer: AIOKafkaConsumer | None = None
+        self._pending: dict[str, set[int] | None] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: list[Task[None]] = []
+
+    async def start(self) -> None:
+        self._consumer = AIOKafkaConsumer(
+            settings.CACHE_INVALIDATION_TOPIC,
+            bootstrap_servers=get_kafka_url(),
+            group_id=None,
+            auto_offset_reset='latest',
+            enable_auto_commit=False,
+        )
+        await self._consumer.start()
+        self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._flush())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        self._tasks = []
+        await self._send_pending()
+        if self._consumer:
+            await self._consumer.stop()
+
+    def _broadcast(self, invalidation: InvalidationKeys) -> None:
+        # Scripts and benchmarks never start the bus; there is no other replica to reach.
+        if not self._tasks:
+            return
+        for cache_name, keys in invalidation.items():
+            if keys is None or (cache_name in self._pending and self._pending[cache_name] is None):
+                self._pending[cache_name] = None
+            else:
+                self._pending.setdefault(cache_name, set()).update(keys)
+        self._wakeup.set()
+
+    async def _flush(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                await asyncio.sleep(settings.CACHE_INVALIDATION_LINGER_MS / 1000)
+                self._wakeup.clear()
+                await self._send_pending()
+        except asyncio.CancelledError:
+            pass
+
+    async def _send_pending(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        message = KafkaCacheInvalidation(
+            origin=self._instance_id,
+            keys={cache_name: sorted(keys) for cache_name, keys in pending.items() if keys is not None},
+            cleared=[cache_name for cache_name, keys in pending.items() if keys is None],
+        )
+        await self._producer.send_bytes(
+            self._instance_id,
+            message.to_kafka_bytes(),
+            topic=settings.CACHE_INVALIDATION_TOPIC,
+        )
+        INVALIDATION_MESSAGES.inc('sent')
+
+    async def _consume(self) -> None:
+        try:
+            while True:
+                try:
+                    records = await self._consumer.getmany(timeout_ms=1000)
+                except KafkaError as e:
+                    print(e)
+                    await asyncio.sleep(settings.KAFKA_RETRY_BACKOFF_MS / 1000)
+                    continue
+                for messages in records.values():
+                    for msg in messages:
+                        self._receive(msg.topic, msg.offset, msg.value)
+        except asyncio.CancelledError:
+            pass
+
+    def _receive(self, topic: str, offset: int, value: bytes) -> None:
+        try:
+            message = KafkaCacheInvalidation.model_validate_json(value)
+        except ValidationError as e:
+            print(f"{topic}[{offset}]: {e!r}")
+            return
+        if message.origin == self._instance_id:
+            return
+        INVALIDATION_MESSAGES.inc('received')
+        self._apply({**message.keys, **dict.fromkeys(message.cleared)})
@@ -0,0 +1,50 @@
+from app.metrics import Counter, Gauge, Histogram
+
+CONSUMER_MESSAGES = Counter(
+    'kafka_consumer_messages_total',
+    'Messages handled by the consumer',
+    ['topic'],
+)
+CONSUMER_ERRORS = Counter(
+    'kafka_consumer_errors_total',
+    'Messages whose handling failed',
+    ['topic'],
+)
+CONSUMER_HANDLER_SECONDS = Histogram(
+    'kafka_consumer_handler_seconds',
+    'Handler latency, per message or per batch for batch handlers',
+    ['topic'],
+)
+CONSUMER_LAG = Gauge(
+    'kafka_consumer_lag',
+    'Highwater minus committed offset',
+    ['topic', 'partition'],
+)
+CONSUMER_IN_FLIGHT = Gauge(
+    'kafka_consumer_in_flight',
+    'Handler jobs dispatched and not yet finished',
+)
+PRODUCER_DELIVERED = Counter(
+    'kafka_producer_delivered_total',
+    'Records acknowledged by the broker',
+    ['topic'],
+)
+PRODUCER_RETRIED = Counter(
+    'kafka_producer_retried_total',
+    'Failed deliveries put on the retry queue',
+    ['topic'],
+)
+PRODUCER_FAILED = Counter(
+    'kafka_producer_failed_total',
+    'Records dropped after exhausting retries',
+    ['topic'],
+)
+PRODUCER_QUEUE_DEPTH = Gauge(
+    'kafka_producer_queue_depth',
+    'Records sent and not yet acknowledged, including retries',
+)
+INVALIDATION_MESSAGES = Counter(
+    'kafka_cache_invalidation_messages_total',
+    'Cache invalidation messages sent to and received from other replicas',
+    ['direction'],
+)
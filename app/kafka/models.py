@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, LargeBinary, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ProcessedMessage(Base):
+    __tablename__ = "kafka_processed_messages"
+    topic: Mapped[str] = mapped_column(primary_key=True)
+    partition: Mapped[int] = mapped_column(primary_key=True)
+    offset: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    extend_existing = True
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(topic={self.topic}, partition={self.partition}, offset={self.offset})'
+
+
+class OutboxEvent(Base):
+    __tablename__ = "kafka_outbox"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    topic: Mapped[str]
+    key: Mapped[str]
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    extend_existing = True
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(id={self.id}, topic={self.topic})'
@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+from aiokafka import TopicPartition
+
+
+class OffsetTracker:
+    """
+    Tracks offsets dispatched out of order and exposes, per partition, the offset
+    that is safe to commit: everything below it has been handled.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[TopicPartition, set[int]] = defaultdict(set)
+        self._next: dict[TopicPartition, int] = {}
+        self._committed: dict[TopicPartition, int] = {}
+
+    @property
+    def committed(self) -> dict[TopicPartition, int]:
+        return self._committed
+
+    def track(self, tp: TopicPartition, offset: int) -> None:
+        self._pending[tp].add(offset)
+        self._next[tp] = max(self._next.get(tp, 0), offset + 1)
+
+    def done(self, tp: TopicPartition, offset: int) -> None:
+        self._pending[tp].discard(offset)
+
+    def committable(self, assigned: set[TopicPartition]) -> dict[TopicPartition, int]:
+        """
+        Offsets of the ``assigned`` partitions that moved since they were last marked committed.
+        Nothing is marked here, so offsets whose commit failed come back on the next call.
+        """
+        committable = {}
+        for tp, next_offset in self._next.items():
+            if tp not in assigned:
+                continue
+            pending = self._pending.get(tp)
+            offset = min(pending) if pending else next_offset
+            if self._committed.get(tp) != offset:
+                committable[tp] = offset
+        return committable
+
+    def mark_committed(self, offsets: dict[TopicPartition, int]) -> None:
+        self._committed.update(offsets)
+
+    def forget(self, partitions: set[TopicPartition]) -> None:
+        for tp in partitions:
+            self._pending.pop(tp, None)
+            self._next.pop(tp, None)
+            self._committed.pop(tp, None)
@@ -0,0 +1,52 @@
+import asyncio
+from asyncio import Task
+from typing import Sequence
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.kafka.dao import OutboxDAO
+from app.kafka.models import OutboxEvent
+from app.kafka.producers import KafkaProducer
+
+
+class OutboxRelay:
+    def __init__(self, producer: KafkaProducer) -> None:
+        self._producer = producer
+        self._task: Task[None] | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._relay())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+
+    async def _relay(self) -> None:
+        batch_size = settings.KAFKA_OUTBOX_BATCH_SIZE
+        try:
+            while True:
+                try:
+                    count = await OutboxDAO.relay_batch(batch_size, self._publish)
+                except SQLAlchemyError as e:
+                    print(e)
+                    count = 0
+                if count < batch_size:
+                    await asyncio.sleep(settings.KAFKA_OUTBOX_POLL_INTERVAL_MS / 1000)
+        except asyncio.CancelledError:
+            pass
+
+    async def _publish(self, events: Sequence[OutboxEvent]) -> set[int]:
+        deliveries = [
+            await self._producer.send_bytes(event.key, event.payload, topic=event.topic)
+            for event in events
+        ]
+        # The claimed rows stay locked until this returns, so the wait for the broker is bounded;
+        # events not acknowledged in time stay in the outbox and are sent again by a later batch.
+        await asyncio.wait(deliveries, timeout=settings.KAFKA_OUTBOX_DELIVERY_TIMEOUT_MS / 1000)
+        return {
+            event.id
+            for event, delivery in zip(events, deliveries)
+            if delivery.done() and not delivery.cancelled() and delivery.exception() is None
+        }
@@ -1,30 +1,156 @@
+import asyncio
+from asyncio import Future, Task
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+
 from aiokafka import AIOKafkaProducer
+from aiokafka.errors import KafkaError
+from aiokafka.structs import RecordMetadata
 
-from app.config import get_kafka_url
+from app.config import get_kafka_url, settings
+from app.kafka.metrics import PRODUCER_DELIVERED, PRODUCER_RETRIED, PRODUCER_FAILED, PRODUCER_QUEUE_DEPTH
 from app.kafka.schemas import KafkaEventBase
 
+DeliveryCallback = Callable[[RecordMetadata | None, BaseException | None], None]
+Headers = list[tuple[str, bytes]]
+
+
+@dataclass
+class _Delivery:
+    topic: str
+    key: str | None
+    value: bytes
+    future: Future[RecordMetadata]
+    on_delivery: DeliveryCallback | None = None
+    headers: Headers | None = None
+    attempt: int = 0
+    retry_at: float = 0.0
+
 
 class KafkaProducer:
     def __init__(self):
-        self._producer = AIOKafkaProducer(bootstrap_servers=get_kafka_url())
+        # Created in start(): AIOKafkaProducer needs a running loop, and this module is imported
+        # by every DAO through the cache invalidation bus, scripts and benchmarks included.
+        self._producer: AIOKafkaProducer | None = None
+        self._pending: set[Future[RecordMetadata]] = set()
+        self._retry_queue: asyncio.Queue[_Delivery] = asyncio.Queue()
+        self._retry_task: Task[None] | None = None
+        PRODUCER_QUEUE_DEPTH.set_function(lambda: {(): self.queue_depth})
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
 
     async def start(self) -> None:
+        self._producer = AIOKafkaProducer(
+            bootstrap_servers=get_kafka_url(),
+            linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+            max_batch_size=settings.KAFKA_PRODUCER_MAX_BATCH_SIZE,
+            compression_type=settings.KAFKA_PRODUCER_COMPRESSION,
+        )
         await self._producer.start()
+        self._retry_task = asyncio.create_task(self._retry())
         return None
 
     async def stop(self) -> None:
+        await self.flush()
+        if self._retry_task:
+            self._retry_task.cancel()
         if self._producer:
             await self._producer.stop()
         return None
 
-    async def send(self, key: str, message: KafkaEventBase) -> None:
+    async def flush(self) -> None:
+        if self._producer:
+            await self._producer.flush()
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+
+    async def send(self,
+                   key: str,
+                   message: KafkaEventBase,
+                   topic: str = 'factory_order_updates',
+                   on_delivery: DeliveryCallback | None = None) -> Future[RecordMetadata]:
+        return await self.send_bytes(key, message.to_kafka_bytes(), topic=topic, on_delivery=on_delivery)
+
+    async def send_bytes(self,
+                         key: str | None,
+                         value: bytes,
+                         topic: str = 'factory_order_updates',
+                         on_delivery: DeliveryCallback | None = None,
+                         headers: Headers | None = None) -> Future[RecordMetadata]:
         if not self._producer:
             raise RuntimeError("Kafka producer not started")
-        await self._producer.send_and_wait(
-            topic='factory_order_updates',
-            key=key.encode('utf-8'),
-            value=message.to_kafka_bytes(),
-        )
-        return None
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._pending.discard)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending.add(future)
+        await self._enqueue(_Delivery(topic, key, value, future, on_delivery, headers))
+        return future
+
+    async def send_many(self,
+                        messages: list[tuple[str, KafkaEventBase]],
+                        topic: str = 'factory_order_updates',
+                        on_delivery: DeliveryCallback | None = None) -> list[Future[RecordMetadata]]:
+        return [
+            await self.send(key, message, topic=topic, on_delivery=on_delivery)
+            for key, message in messages
+        ]
+
+    async def _enqueue(self, delivery: _Delivery) -> None:
+        try:
+            sent = await self._producer.send(
+                topic=delivery.topic,
+                key=delivery.key.encode('utf-8') if delivery.key is not None else None,
+                value=delivery.value,
+                headers=delivery.headers,
+            )
+        except Exception as e:
+            self._on_sent(delivery, error=e)
+        else:
+            sent.add_done_callback(partial(self._on_sent_future, delivery))
+
+    def _on_sent_future(self, delivery: _Delivery, sent: Future[RecordMetadata]) -> None:
+        if sent.cancelled():
+            self._on_sent(delivery, error=KafkaError('Send was cancelled'))
+        elif sent.exception() is not None:
+            self._on_sent(delivery, error=sent.exception())
+        else:
+            self._on_sent(delivery, metadata=sent.result())
+
+    def _on_sent(self,
+                 delivery: _Delivery,
+                 metadata: RecordMetadata | None = None,
+                 error: BaseException | None = None) -> None:
+        if error is not None and delivery.attempt < settings.KAFKA_PRODUCER_MAX_RETRIES:
+            PRODUCER_RETRIED.inc(delivery.topic)
+            delivery.attempt += 1
+            backoff = settings.KAFKA_PRODUCER_RETRY_BACKOFF_MS / 1000 * 2 ** (delivery.attempt - 1)
+            delivery.retry_at = asyncio.get_running_loop().time() + backoff
+            self._retry_queue.put_nowait(delivery)
+            return
+
+        if error is None:
+            PRODUCER_DELIVERED.inc(delivery.topic)
+            delivery.future.set_result(metadata)
+        else:
+            PRODUCER_FAILED.inc(delivery.topic)
+            print(f"{delivery.topic}[{delivery.key}]: {error!r}")
+            delivery.future.set_exception(error)
+        if delivery.on_delivery is not None:
+            delivery.on_delivery(metadata, error)
+
+    async def _retry(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                delivery = await self._retry_queue.get()
+                delay = delivery.retry_at - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._enqueue(delivery)
+        except asyncio.CancelledError:
+            pass
 
 kafka_producer = KafkaProducer()
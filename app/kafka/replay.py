@@ -0,0 +1,68 @@
+"""
+Pushes dead-lettered messages back to their source topic.
+
+Usage: python -m app.kafka.replay <topic> [--limit N]
+"""
+import argparse
+import asyncio
+
+from aiokafka import AIOKafkaConsumer
+
+from app.config import get_kafka_url
+from app.kafka.retry import SERVICE_HEADERS
+from app.kafka.topics import dlq_topic
+
+
+async def replay_dead_letters(topic: str, limit: int | None = None) -> int:
+    # app.kafka.producers builds its module-level producer on import, which needs a running loop
+    from app.kafka.producers import KafkaProducer
+
+    consumer = AIOKafkaConsumer(
+        dlq_topic(topic),
+        bootstrap_servers=get_kafka_url(),
+        group_id="fastapi-dlq-replay",
+        auto_offset_reset="earliest",
+        enable_auto_commit=False,
+    )
+    producer = KafkaProducer()
+    await consumer.start()
+    await producer.start()
+    replayed = 0
+    try:
+        while limit is None or replayed < limit:
+            batches = await consumer.getmany(
+                timeout_ms=1000,
+                max_records=None if limit is None else limit - replayed,
+            )
+            if not batches:
+                break
+            deliveries = []
+            for messages in batches.values():
+                for msg in messages:
+                    key = msg.key.decode('utf-8') if isinstance(msg.key, bytes) else msg.key
+                    headers = [
+                        (name, value)
+                        for name, value in msg.headers or ()
+                        if name not in SERVICE_HEADERS
+                    ]
+                    deliveries.append(await producer.send_bytes(key, msg.value, topic=topic, headers=headers))
+            await asyncio.gather(*deliveries)
+            await consumer.commit()
+            replayed += len(deliveries)
+    finally:
+        await producer.stop()
+        await consumer.stop()
+    return replayed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay dead-lettered Kafka messages")
+    parser.add_argument("topic", help="Source topic whose dead-letter topic should be replayed")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of messages to replay")
+    args = parser.parse_args()
+    replayed = asyncio.run(replay_dead_letters(args.topic, args.limit))
+    print(f"Replayed {replayed} messages to {args.topic}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import time
+from typing import TYPE_CHECKING
+
+from aiokafka import ConsumerRecord
+from pydantic import ValidationError
+
+from app.config import settings
+from app.kafka.topics import retry_topic, dlq_topic, source_topic
+from app.orders.services import InvalidStatusError
+
+if TYPE_CHECKING:
+    from app.kafka.producers import KafkaProducer
+
+ORIGINAL_TOPIC_HEADER = 'x-original-topic'
+ORIGINAL_PARTITION_HEADER = 'x-original-partition'
+ORIGINAL_OFFSET_HEADER = 'x-original-offset'
+ORIGINAL_TIMESTAMP_HEADER = 'x-original-timestamp'
+ATTEMPT_HEADER = 'x-retry-attempt'
+RETRY_AT_HEADER = 'x-retry-at'
+ERROR_TYPE_HEADER = 'x-error-type'
+ERROR_HEADER = 'x-error'
+
+SERVICE_HEADERS = {
+    ORIGINAL_TOPIC_HEADER,
+    ORIGINAL_PARTITION_HEADER,
+    ORIGINAL_OFFSET_HEADER,
+    ORIGINAL_TIMESTAMP_HEADER,
+    ATTEMPT_HEADER,
+    RETRY_AT_HEADER,
+    ERROR_TYPE_HEADER,
+    ERROR_HEADER,
+}
+
+NON_RETRYABLE_ERRORS = (ValidationError, json.JSONDecodeError, UnicodeDecodeError, InvalidStatusError)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def retry_at(msg: ConsumerRecord) -> int:
+    headers = dict(msg.headers or ())
+    return int(headers.get(RETRY_AT_HEADER, b'0'))
+
+
+def original_timestamp(msg: ConsumerRecord) -> int:
+    # Retried records are produced anew, their own timestamp is the time of the retry
+    headers = dict(msg.headers or ())
+    return int(headers.get(ORIGINAL_TIMESTAMP_HEADER, str(msg.timestamp).encode()))
+
+
+class RetryScheduler:
+    """
+    Routes failed messages either to the retry topic of their source topic, with
+    an exponentially growing due time, or to its dead-letter topic once the attempts
+    are exhausted or the error cannot be fixed by retrying.
+    """
+
+    def __init__(self, producer: 'KafkaProducer') -> None:
+        self._producer = producer
+
+    @staticmethod
+    def backoff_ms(topic: str, attempt: int) -> int:
+        base = settings.KAFKA_RETRY_BACKOFF_MS_BY_TOPIC.get(topic, settings.KAFKA_RETRY_BACKOFF_MS)
+        return min(base * 2 ** (attempt - 1), settings.KAFKA_RETRY_MAX_BACKOFF_MS)
+
+    async def schedule(self, msg: ConsumerRecord, error: Exception) -> None:
+        topic = source_topic(msg.topic)
+        headers = dict(msg.headers or ())
+        headers.setdefault(ORIGINAL_TOPIC_HEADER, msg.topic.encode())
+        headers.setdefault(ORIGINAL_PARTITION_HEADER, str(msg.partition).encode())
+        headers.setdefault(ORIGINAL_OFFSET_HEADER, str(msg.offset).encode())
+        headers.setdefault(ORIGINAL_TIMESTAMP_HEADER, str(msg.timestamp).encode())
+        headers[ERROR_TYPE_HEADER] = type(error).__name__.encode()
+        headers[ERROR_HEADER] = str(error).encode()
+
+        attempt = int(headers.get(ATTEMPT_HEADER, b'0')) + 1
+        if isinstance(error, NON_RETRYABLE_ERRORS) or attempt > settings.KAFKA_RETRY_MAX_ATTEMPTS:
+            target = dlq_topic(topic)
+        else:
+            target = retry_topic(topic)
+            headers[ATTEMPT_HEADER] = str(attempt).encode()
+            headers[RETRY_AT_HEADER] = str(_now_ms() + self.backoff_ms(topic, attempt)).encode()
+
+        key = msg.key.decode('utf-8') if isinstance(msg.key, bytes) else msg.key
+        delivery = await self._producer.send_bytes(key, msg.value, topic=target, headers=list(headers.items()))
+        await delivery
@@ -1,7 +1,5 @@
-import json
-from datetime import datetime
 from enum import Enum
-from typing import Any, Optional, Self
+from typing import Optional, Self
 from uuid import UUID
 
 from pydantic import BaseModel, Field, model_validator
@@ -9,17 +7,7 @@ from pydantic import BaseModel, Field, model_validator
 
 class KafkaEventBase(BaseModel):
     def to_kafka_bytes(self) -> bytes:
-        def default_serializer(obj: Any) -> Any:
-            if isinstance(obj, UUID):
-                return str(obj)
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Type {type(obj)} not serializable")
-
-        return json.dumps(
-            self.model_dump(exclude_none=True, exclude_unset=True),
-            default=default_serializer
-        ).encode("utf-8")
+        return self.__pydantic_serializer__.to_json(self, exclude_none=True, exclude_unset=True)
 
 
 class KafkaNewSupplierPrice(BaseModel):
@@ -143,3 +131,18 @@ class KafkaNewOrderStatus(KafkaEventBase):
             raise ValueError("new_status cannot be None if event_type is NEW_STATUS")
         return self
 
+
+
+class KafkaCacheInvalidation(KafkaEventBase):
+    """
+    Message sample
+
+    {
+        "origin": "api-7f9c-1-3fa85f64",
+        "keys": {"products": [2, 15], "suppliers": [4]},
+        "cleared": ["auth_users"]
+    }
+    """
+    origin: str = Field(..., description='Экземпляр приложения, изменивший данные')
+    keys: dict[str, list[int]] = Field(default_factory=dict, description='Изменившиеся идентификаторы по кэшам')
+    cleared: list[str] = Field(default_factory=list, description='Кэши, сбрасываемые целиком')
@@ -1,14 +1,54 @@
 from typing import Self, Optional, Any, Type
 
-from aiokafka.admin import NewTopic, AIOKafkaAdminClient
+from aiokafka.admin import NewTopic, NewPartitions, AIOKafkaAdminClient
+
+from app.config import get_kafka_url, settings
+
+RETRY_SUFFIX = '.retry'
+DLQ_SUFFIX = '.dlq'
+
+CONSUMED_TOPICS = [
+    'supplier_price_updates',
+    'product_remaining_stock_updates',
+    'supplier_order_updates',
+]
+
+
+def retry_topic(topic: str) -> str:
+    return f'{topic}{RETRY_SUFFIX}'
+
+
+def dlq_topic(topic: str) -> str:
+    return f'{topic}{DLQ_SUFFIX}'
+
+
+def source_topic(topic: str) -> str:
+    return topic.removesuffix(RETRY_SUFFIX)
+
+
+def _new_topic(name: str,
+               partitions_of: str | None = None,
+               topic_configs: dict[str, str] | None = None) -> NewTopic:
+    return NewTopic(
+        name=name,
+        num_partitions=settings.KAFKA_TOPIC_PARTITIONS.get(partitions_of or name, settings.KAFKA_NUM_PARTITIONS),
+        replication_factor=settings.KAFKA_REPLICATION_FACTOR,
+        topic_configs=topic_configs or {},
+    )
 
-from app.config import get_kafka_url
 
 KAFKA_TOPICS = [
-    NewTopic(name='supplier_price_updates', num_partitions=1, replication_factor=1),
-    NewTopic(name='product_remaining_stock_updates', num_partitions=1, replication_factor=1),
-    NewTopic(name='supplier_order_updates', num_partitions=1, replication_factor=1),
-    NewTopic(name='factory_order_updates', num_partitions=1, replication_factor=1),
+    *[_new_topic(topic) for topic in CONSUMED_TOPICS],
+    _new_topic('factory_order_updates'),
+    _new_topic(settings.CACHE_INVALIDATION_TOPIC, topic_configs={
+        'cleanup.policy': 'delete',
+        'retention.ms': str(settings.CACHE_INVALIDATION_RETENTION_MS),
+    }),
+    *[
+        _new_topic(name, partitions_of=topic)
+        for topic in CONSUMED_TOPICS
+        for name in (retry_topic(topic), dlq_topic(topic))
+    ],
 ]
 
 class KafkaTopicManager:
@@ -36,5 +76,26 @@ class KafkaTopicManager:
         await self.admin_client.create_topics(new_topics=topics_to_create)
         return None
 
+    async def grow_partitions(self, topics: list[NewTopic]) -> None:
+        if not self.admin_client:
+            raise RuntimeError("Admin client is not started")
+        described = await self.admin_client.describe_topics([topic.name for topic in topics])
+        current_partitions = {
+            topic['topic']: len(topic['partitions'])
+            for topic in described
+            if topic['partitions']
+        }
+        topics_to_grow = {
+            topic.name: NewPartitions(total_count=topic.num_partitions)
+            for topic in topics
+            if topic.name in current_partitions and current_partitions[topic.name] < topic.num_partitions
+        }
+
+        if not topics_to_grow:
+            return
+        print('Growing partitions', {name: new.total_count for name, new in topics_to_grow.items()})
+        await self.admin_client.create_partitions(topics_to_grow)
+        return None
+
 
 topic_manager = KafkaTopicManager()
\ No newline at end of file
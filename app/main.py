@@ -4,6 +4,7 @@ from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.auth.api import router as auth_router
 from app.kafka.topics import KafkaTopicManager, KAFKA_TOPICS
@@ -13,23 +14,33 @@ from app.orders.api import router as orders_router
 
 from app.kafka.consumers import KafkaConsumer, PriceConsumer, StockConsumer, OrderConsumer
 from app.kafka.producers import kafka_producer
+from app.kafka.outbox import OutboxRelay
+from app.invalidation import invalidation_bus
+from app.kafka.retry import RetryScheduler
+from app.metrics import registry as metrics_registry
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     async with KafkaTopicManager() as manager:
         await manager.create_topics(KAFKA_TOPICS)
+        await manager.grow_partitions(KAFKA_TOPICS)
     loop = asyncio.get_event_loop()
-    kafka_consumer = KafkaConsumer(loop)
+    kafka_consumer = KafkaConsumer(loop, RetryScheduler(kafka_producer))
     _ = PriceConsumer(kafka_consumer)
     _ = StockConsumer(kafka_consumer)
     _ = OrderConsumer(kafka_consumer)
+    outbox_relay = OutboxRelay(kafka_producer)
     try:
-        await kafka_consumer.start()
         await kafka_producer.start()
+        await invalidation_bus.start()
+        await kafka_consumer.start()
+        await outbox_relay.start()
         yield
     finally:
         await kafka_consumer.stop()
+        await outbox_relay.stop()
+        await invalidation_bus.stop()
         await kafka_producer.stop()
 app = FastAPI(lifespan=lifespan)
 
@@ -47,3 +58,9 @@ app.include_router(suppliers_router)
 app.include_router(orders_router)
 
 
+@app.get('/metrics', include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type='text/plain; version=0.0.4; charset=utf-8',
+    )
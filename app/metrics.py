@@ -0,0 +1,130 @@
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+Labels = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, "Metric"] = {}
+
+    def register(self, metric: "Metric") -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.collect():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class Metric(ABC):
+    type = 'untyped'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Iterable[str] = (),
+                 metrics_registry: MetricsRegistry = registry) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        metrics_registry.register(self)
+
+    @abstractmethod
+    def collect(self) -> Iterable[Sample]:
+        ...
+
+    def _labels(self, labelvalues: Labels) -> dict[str, str]:
+        return dict(zip(self.labelnames, labelvalues))
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self) -> Iterable[Sample]:
+        for labelvalues, value in self._values.items():
+            yield self.name, self._labels(labelvalues), value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[Labels, float] = {}
+        self._function: Callable[[], dict[Labels, float]] | None = None
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def set_function(self, function: Callable[[], dict[Labels, float]]) -> None:
+        self._function = function
+
+    def collect(self) -> Iterable[Sample]:
+        values = self._function() if self._function is not None else self._values
+        for labelvalues, value in values.items():
+            yield self.name, self._labels(labelvalues), value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._buckets = tuple(sorted(buckets))
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        counts = self._counts.setdefault(labelvalues, [0] * (len(self._buckets) + 1))
+        counts[bisect_left(self._buckets, value)] += 1
+        self._sums[labelvalues] = self._sums.get(labelvalues, 0) + value
+
+    def collect(self) -> Iterable[Sample]:
+        for labelvalues, counts in self._counts.items():
+            labels = self._labels(labelvalues)
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield f'{self.name}_sum', labels, self._sums[labelvalues]
+            yield f'{self.name}_count', labels, cumulative
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.auth.dependencies import get_current_user, get_current_admin_user
 from app.auth.models import User, Role
@@ -18,20 +19,36 @@ from app.orders.services import (
     delete_products_from_order,
     set_next_status,
     InvalidStatusError,
-    send_new_order_event, find_not_supplied_order_products
+    send_order_to_supplier,
+    find_not_supplied_order_products
 )
 from app.products.schemas import SProduct
+from app.schemas import SPaginationParams, SPageResponse
+from app.database import get_unit_of_work
+from app.dependencies import get_pagination
+from app.export import ExportFormat, export_response
 
-router = APIRouter(prefix='/orders', tags=['Orders'])
+router = APIRouter(prefix='/orders', tags=['Orders'], dependencies=[Depends(get_unit_of_work)])
 
 
 @router.get('/')
-async def all_orders(current_user: User = Depends(get_current_user)) -> list[SOrder]:
+async def all_orders(pagination: SPaginationParams = Depends(get_pagination),
+                     current_user: User = Depends(get_current_user)) -> SPageResponse[SOrder]:
     user_id = current_user.id
     if current_user.role == Role.ADMIN:
         user_id = None
-    orders = await OrdersDAO.find_all_by_user_id(user_id)
-    return orders
+    orders = await OrdersDAO.find_all_projected_by_user_id(user_id, pagination)
+    return SPageResponse.from_projection(orders, pagination, SOrder)
+
+
+@router.get('/export/')
+async def export_orders(export_format: ExportFormat = ExportFormat.NDJSON,
+                        current_user: User = Depends(get_current_user)) -> StreamingResponse:
+    user_id = current_user.id
+    if current_user.role == Role.ADMIN:
+        user_id = None
+    chunks = OrdersDAO.stream_all_by_user_id(user_id)
+    return export_response(chunks, SOrder, export_format, 'orders')
 
 
 @router.post('/')
@@ -48,7 +65,7 @@ def _check_access_to_order(order: Order, user: User) -> bool:
 @router.get('/{order_id}/')
 async def get_order_by_id(order_id: int,
                           current_user: User = Depends(get_current_user)) -> SFullOrder:
-    order = await OrdersDAO.find_full_by_id(order_id)
+    order = await OrdersDAO.find_full_by_id(order_id, from_replica=True)
     if order is None or not _check_access_to_order(order, current_user):
         raise HTTPException(
             status_code=404,
@@ -156,21 +173,19 @@ async def set_order_status_cancelled(order_id: int,
 @router.put('/{order_id}/status/set_sent_to_supplier/')
 async def set_order_status_sent_to_supplier(order_id: int,
                                             current_user: User = Depends(get_current_user)) -> SOrder:
-    order = await OrdersDAO.find_one_or_none_by_id(order_id)
+    order = await OrdersDAO.find_full_by_id(order_id)
     if order is None or not _check_access_to_order(order, current_user):
         raise HTTPException(
             status_code=404,
             detail=f'Order with {order_id=} not found.',
         )
     try:
-        await set_next_status(order, Status.SEND_TO_SUPPLIER)
+        order = await send_order_to_supplier(order)
     except InvalidStatusError as e:
         raise HTTPException(
             status_code=400,
             detail=str(e),
         )
-    order = await OrdersDAO.find_full_by_id(order_id)
-    await send_new_order_event(order)
     return SOrder.model_validate(order, from_attributes=True)
 
 
@@ -1,10 +1,23 @@
-from sqlalchemy import select, delete as sqlalchemy_delete
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload, contains_eager
+from typing import AsyncIterator, Sequence
+from uuid import UUID
 
-from app.dao.base import BaseDAO
-from app.database import async_session_maker
+from sqlalchemy import (
+    select,
+    delete as sqlalchemy_delete,
+    update as sqlalchemy_update,
+    values,
+    column,
+    Uuid,
+    Text,
+)
+from sqlalchemy.orm import joinedload, contains_eager, aliased, selectinload
+
+from app.dao.base import BaseDAO, bind_param_chunks
+from app.database import read_session, replica_session, write_session
+from app.kafka.models import OutboxEvent
 from app.orders.models import Order, OrderProduct, Status
+from app.schemas import SPaginationParams
+from app.suppliers.models import Supplier
 
 
 class OrdersDAO(BaseDAO[Order]):
@@ -12,24 +25,77 @@ class OrdersDAO(BaseDAO[Order]):
 
     @classmethod
     async def find_all_by_user_id(cls,
-                                  user_id: int | None):
-        async with async_session_maker() as session:
+                                  user_id: int | None,
+                                  pagination: SPaginationParams | None = None) -> Sequence[Order]:
+        async with replica_session() as session:
             query = (
                 select(cls.model)
                 .options(joinedload(cls.model.supplier))
             )
             if user_id:
                 query = query.where(cls.model.user_id == user_id)
+            query = cls.paginate(query, pagination)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
-    async def find_full_by_id(cls, order_id: int) -> Order | None:
-        async with async_session_maker() as session:
+    async def find_all_projected_by_user_id(cls,
+                                            user_id: int | None,
+                                            pagination: SPaginationParams | None = None) -> list[dict]:
+        """
+        Rows shaped like SOrder, read as plain columns of the order and its supplier.
+        """
+        # project() only selects columns of the DAO's own model, and SOrder nests the
+        # supplier, so the join and the nested dict are built here instead.
+        async with replica_session() as session:
+            query = (
+                select(
+                    cls.model.id,
+                    cls.model.number,
+                    cls.model.status,
+                    cls.model.cancel_comment,
+                    Supplier.id.label('supplier_id'),
+                    Supplier.ogrn.label('supplier_ogrn'),
+                    Supplier.title.label('supplier_title'),
+                )
+                .join(Supplier, Supplier.id == cls.model.supplier_id)
+            )
+            if user_id:
+                query = query.where(cls.model.user_id == user_id)
+            result = await session.execute(cls.paginate(query, pagination))
+            return [
+                {
+                    'id': row.id,
+                    'number': row.number,
+                    'status': row.status,
+                    'cancel_comment': row.cancel_comment,
+                    'supplier': {'id': row.supplier_id, 'ogrn': row.supplier_ogrn, 'title': row.supplier_title},
+                }
+                for row in result
+            ]
+
+    @classmethod
+    def stream_all_by_user_id(cls, user_id: int | None) -> AsyncIterator[Sequence[Order]]:
+        query = (
+            select(cls.model)
+            .options(joinedload(cls.model.supplier))
+            .order_by(cls.model.id)
+        )
+        if user_id:
+            query = query.where(cls.model.user_id == user_id)
+        return cls.stream(query)
+
+    @classmethod
+    async def find_full_by_id(cls, order_id: int, from_replica: bool = False) -> Order | None:
+        """
+        Reads from the primary unless ``from_replica`` is set: most callers check the order's
+        status before writing to it, and a lagging replica could approve a stale state.
+        """
+        async with (replica_session() if from_replica else read_session()) as session:
             query = (
                 select(cls.model)
                 .options(
-                    joinedload(cls.model.products)
+                    selectinload(cls.model.products)
                     .options(joinedload(OrderProduct.product)),
                     joinedload(cls.model.supplier),
                     joinedload(cls.model.user),
@@ -37,17 +103,86 @@ class OrdersDAO(BaseDAO[Order]):
                 .where(cls.model.id == order_id)
             )
             result = await session.execute(query)
-            return result.scalars().unique().one_or_none()
-
+            return result.scalars().one_or_none()
 
+    @classmethod
+    async def set_status(cls,
+                         order_id: int,
+                         status: Status,
+                         valid_prev_statuses: set[Status],
+                         comment: str | None = None,
+                         outbox_event: OutboxEvent | None = None) -> Order | None:
+        """
+        Switches the order to ``status`` only if its current status is one of ``valid_prev_statuses``,
+        checked by the UPDATE itself so concurrent transitions cannot both succeed. Returns None,
+        without adding ``outbox_event``, when the order is missing or in another status.
+        """
+        updated_order = (
+            sqlalchemy_update(cls.model)
+            .where(cls.model.id == order_id, cls.model.status.in_(valid_prev_statuses))
+            .values(status=status, cancel_comment=comment)
+            .returning(*cls.model.__table__.columns)
+            .cte('updated_order')
+        )
+        order = aliased(cls.model, updated_order)
+        async with write_session() as session:
+            query = (
+                select(order)
+                .options(
+                    joinedload(order.products)
+                    .options(joinedload(OrderProduct.product)),
+                    joinedload(order.supplier),
+                    joinedload(order.user),
+                )
+                .execution_options(populate_existing=True)
+            )
+            result = await session.execute(query)
+            updated = result.scalars().unique().one_or_none()
+            if updated is None:
+                return None
+            if outbox_event is not None:
+                session.add(outbox_event)
+            return updated
 
+    @classmethod
+    async def bulk_set_status(
+            cls,
+            transitions: Sequence[tuple[Status, set[Status], dict[UUID, str | None]]]
+    ) -> list[set[UUID]]:
+        applied = []
+        async with write_session() as session:
+            for status, valid_prev_statuses, comments in transitions:
+                numbers = set()
+                for chunk in bind_param_chunks(list(comments.items()), 2, fixed_params=1 + len(valid_prev_statuses)):
+                    new_statuses = values(
+                        column('number', Uuid),
+                        column('cancel_comment', Text),
+                        name='new_statuses',
+                    ).data(chunk)
+                    query = (
+                        sqlalchemy_update(cls.model)
+                        .where(
+                            cls.model.number == new_statuses.c.number,
+                            cls.model.status.in_(valid_prev_statuses),
+                        )
+                        .values(status=status, cancel_comment=new_statuses.c.cancel_comment)
+                        .returning(cls.model.number)
+                        .execution_options(synchronize_session=False)
+                    )
+                    result = await session.execute(query)
+                    numbers.update(result.scalars().all())
+                applied.append(numbers)
+        return applied
 
     @classmethod
-    async def set_status(cls, order_id: int, status: Status, comment: str | None = None) -> Order:
-        count = await cls.update({'id': order_id}, status=status, cancel_comment=comment)
-        if count == 0:
-            raise ValueError(f'Something went wrong while setting status {status} for order with id={order_id}')
-        return await cls.find_full_by_id(order_id)
+    async def find_statuses_by_numbers(cls, numbers: set[UUID]) -> dict[UUID, Status]:
+        async with read_session() as session:
+            query = (
+                select(cls.model.number, cls.model.status)
+                .where(cls.model.number.in_(numbers))
+            )
+            result = await session.execute(query)
+            return {number: status for number, status in result.all()}
 
 
 class OrderProductDAO(BaseDAO[OrderProduct]):
@@ -57,17 +192,11 @@ class OrderProductDAO(BaseDAO[OrderProduct]):
     async def delete_by_order_id_and_product_ids(cls,
                                                  order_id: int,
                                                  product_ids: list[int]) -> int:
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = (
-                    sqlalchemy_delete(cls.model)
-                    .filter_by(order_id=order_id)
-                    .filter(cls.model.product_id.in_(product_ids))
-                )
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with write_session() as session:
+            query = (
+                sqlalchemy_delete(cls.model)
+                .filter_by(order_id=order_id)
+                .filter(cls.model.product_id.in_(product_ids))
+            )
+            result = await session.execute(query)
+            return result.rowcount
@@ -23,11 +23,11 @@ class Status(str, Enum):
 
 class Order(Base):
     id: Mapped[int_pk]
-    number: Mapped[UUID] = mapped_column(server_default=func.gen_random_uuid())
+    number: Mapped[UUID] = mapped_column(server_default=func.gen_random_uuid(), unique=True, index=True)
     status: Mapped[Status]
     cancel_comment: Mapped[str] = mapped_column(Text, nullable=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
-    supplier_id: Mapped[int] = mapped_column(ForeignKey('suppliers.id'), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False, index=True)
+    supplier_id: Mapped[int] = mapped_column(ForeignKey('suppliers.id'), nullable=False, index=True)
     total_cost: Mapped[int] = mapped_column(nullable=True)
 
     user: Mapped["User"] = relationship("User", back_populates="orders")
@@ -43,7 +43,7 @@ class Order(Base):
 class OrderProduct(Base):
     __tablename__ = "order_products"
     order_id: Mapped[int] = mapped_column(ForeignKey('orders.id'), primary_key=True)
-    product_id: Mapped[str] = mapped_column(ForeignKey('products.id'), primary_key=True)
+    product_id: Mapped[str] = mapped_column(ForeignKey('products.id'), primary_key=True, index=True)
     amount: Mapped[int]
 
     order: Mapped["Order"] = relationship("Order", back_populates="products")
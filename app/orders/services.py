@@ -1,4 +1,7 @@
-from app.kafka.producers import kafka_producer
+from collections import defaultdict
+from uuid import UUID
+
+from app.kafka.models import OutboxEvent
 from app.kafka.schemas import KafkaProduct, KafkaOrder, KafkaNewOrderStatus, MessageType, KafkaNewOrderSupplierStatus, \
     KafkaOrderStatus
 from app.orders.dao import OrdersDAO, OrderProductDAO
@@ -45,7 +48,7 @@ async def add_products_to_order(order_id: int,
         }
         for prod in products
     ]
-    await OrderProductDAO.add_all(*new_products)
+    await OrderProductDAO.upsert_many(new_products)
     order = await OrdersDAO.find_full_by_id(order_id)
     return order_to_full_schema(order)
 
@@ -61,6 +64,10 @@ class InvalidStatusError(Exception):
     pass
 
 
+class StatusNotReachedError(Exception):
+    pass
+
+
 async def find_not_supplied_order_products(order: Order) -> set[Product]:
     full_order = await OrdersDAO.find_full_by_id(order.id)
     full_supplier = await SuppliersDAO.find_full_by_id(order.supplier_id)
@@ -77,9 +84,7 @@ async def find_not_supplied_order_products(order: Order) -> set[Product]:
     return not_supplied_product_ids
 
 
-async def send_new_order_event(order: Order) -> None:
-    order = await OrdersDAO.find_full_by_id(order.id)
-    full_products = await ProductDAO.find_full_by_order_id_and_supplier_id(order.id, order.supplier_id)
+def build_new_order_event(order: Order, full_products: list[Product]) -> KafkaNewOrderStatus:
     products = [
         KafkaProduct(
             title=prod.title,
@@ -96,55 +101,156 @@ async def send_new_order_event(order: Order) -> None:
         products=products,
         total_cost=total_cost,
     )
-    event = KafkaNewOrderStatus(
+    return KafkaNewOrderStatus(
         event_type=MessageType.NEW_ORDER,
         order_number=order.number,
         new_order=order_data,
         new_status=None,
     )
-    await kafka_producer.send(order.supplier.ogrn, event)
 
 
-async def update_supplier_order_status(order_status_event: KafkaNewOrderSupplierStatus) -> None:
-    order = await OrdersDAO.find_one_or_none(number=order_status_event.order_number)
-    if not order:
-        raise ValueError(f'Order with number={order_status_event.order_number} not found')
+async def send_order_to_supplier(order: Order) -> Order:
+    if order.status == Status.SEND_TO_SUPPLIER:
+        return order
+    check_next_status(order, Status.SEND_TO_SUPPLIER)
+    full_products = await ProductDAO.find_full_by_order_id_and_supplier_id(order.id, order.supplier_id)
+    event = build_new_order_event(order, full_products)
+    updated = await OrdersDAO.set_status(
+        order.id,
+        Status.SEND_TO_SUPPLIER,
+        VALID_PREV_STATUSES[Status.SEND_TO_SUPPLIER],
+        outbox_event=OutboxEvent(
+            topic='factory_order_updates',
+            key=order.supplier.ogrn,
+            payload=event.to_kafka_bytes(),
+        ),
+    )
+    if updated is None:
+        raise _status_changed_error(order, Status.SEND_TO_SUPPLIER)
+    return updated
+
+
+SUPPLIER_STATUS_MAPPER: dict[KafkaOrderStatus, Status] = {
+    KafkaOrderStatus.SEND_TO_SUPPLIER: Status.SEND_TO_SUPPLIER,
+    KafkaOrderStatus.IN_PROGRESS: Status.IN_PROCESS,
+    KafkaOrderStatus.IN_DELIVERY: Status.IN_DELIVERY,
+    KafkaOrderStatus.DELIVERED: Status.DELIVERED,
+    KafkaOrderStatus.CANCELED: Status.CANCELLED_BY_SUPPLIER,
+}
 
-    status_mapper = {
-        KafkaOrderStatus.SEND_TO_SUPPLIER: Status.SEND_TO_SUPPLIER,
-        KafkaOrderStatus.IN_PROGRESS: Status.IN_PROCESS,
-        KafkaOrderStatus.IN_DELIVERY: Status.IN_DELIVERY,
-        KafkaOrderStatus.DELIVERED: Status.DELIVERED,
-        KafkaOrderStatus.CANCELED: Status.CANCELLED_BY_SUPPLIER,
-    }
-    new_status = status_mapper[order_status_event.status]
-    await set_next_status(order, new_status, order_status_event.cancel_comment)
 
+async def update_supplier_order_statuses(
+        order_status_events: list[KafkaNewOrderSupplierStatus]
+) -> list[Exception | None]:
+    # Events for the same order are split into consecutive rounds so they are applied in arrival order
+    rounds: list[list[int]] = []
+    seen: dict[UUID, int] = defaultdict(int)
+    for i, event in enumerate(order_status_events):
+        order_round = seen[event.order_number]
+        seen[event.order_number] += 1
+        if order_round == len(rounds):
+            rounds.append([])
+        rounds[order_round].append(i)
 
-async def set_next_status(order: Order, status: Status, cancel_comment: str | None = None) -> Order:
+    transitions = []
+    transition_events: list[list[int]] = []
+    for order_round in rounds:
+        by_status: dict[Status, list[int]] = defaultdict(list)
+        for i in order_round:
+            by_status[SUPPLIER_STATUS_MAPPER[order_status_events[i].status]].append(i)
+        for status, event_ids in by_status.items():
+            is_cancel = status == Status.CANCELLED_BY_SUPPLIER
+            transitions.append((
+                status,
+                VALID_PREV_STATUSES[status],
+                {
+                    order_status_events[i].order_number: order_status_events[i].cancel_comment if is_cancel else None
+                    for i in event_ids
+                },
+            ))
+            transition_events.append(event_ids)
+
+    applied = await OrdersDAO.bulk_set_status(transitions)
+    rejected = [
+        i
+        for event_ids, numbers in zip(transition_events, applied)
+        for i in event_ids
+        if order_status_events[i].order_number not in numbers
+    ]
+
+    errors: list[Exception | None] = [None] * len(order_status_events)
+    if not rejected:
+        return errors
+    current_statuses = await OrdersDAO.find_statuses_by_numbers({
+        order_status_events[i].order_number for i in rejected
+    })
+    for i in rejected:
+        event = order_status_events[i]
+        current_status = current_statuses.get(event.order_number)
+        new_status = SUPPLIER_STATUS_MAPPER[event.status]
+        if current_status is None:
+            errors[i] = ValueError(f'Order with number={event.order_number} not found')
+        elif current_status == new_status:
+            continue
+        elif can_reach_status(current_status, VALID_PREV_STATUSES[new_status]):
+            # An earlier event for the order may still be waiting in the retry topic.
+            errors[i] = StatusNotReachedError(
+                f'Order with number={event.order_number} is {current_status}, not yet ready for {new_status}'
+            )
+        else:
+            errors[i] = InvalidStatusError(
+                f'Order with number={event.order_number} cannot switch status from {current_status} to {new_status}'
+            )
+    return errors
+
+
+VALID_PREV_STATUSES: dict[Status, set[Status]] = {
+    Status.CREATED: {Status.FORMING},
+    Status.PAYED: {Status.CREATED},
+    Status.SEND_TO_SUPPLIER: {Status.CREATED},
+    Status.IN_PROCESS: {Status.SEND_TO_SUPPLIER},
+    Status.IN_DELIVERY: {Status.IN_PROCESS},
+    Status.DELIVERED: {Status.IN_DELIVERY},
+    Status.COMPLETED: {Status.DELIVERED},
+    Status.CANCELLED_BY_FACTORY: {
+        Status.CREATED,
+        Status.PAYED,
+        Status.SEND_TO_SUPPLIER,
+        Status.IN_PROCESS,
+    },
+    Status.CANCELLED_BY_SUPPLIER: {
+        Status.SEND_TO_SUPPLIER,
+        Status.IN_PROCESS,
+    },
+}
+
+
+def can_reach_status(status: Status, targets: set[Status]) -> bool:
+    """
+    Whether an order in ``status`` is in one of ``targets`` or can get there through valid transitions.
+    """
+    seen = {status}
+    frontier = [status]
+    while frontier:
+        current = frontier.pop()
+        if current in targets:
+            return True
+        for next_status, prev_statuses in VALID_PREV_STATUSES.items():
+            if current in prev_statuses and next_status not in seen:
+                seen.add(next_status)
+                frontier.append(next_status)
+    return False
+
+
+def _status_changed_error(order: Order, status: Status) -> InvalidStatusError:
+    return InvalidStatusError(
+        f'Order with id={order.id} cannot switch status to {status}: its status was changed concurrently'
+    )
+
+
+def check_next_status(order: Order, status: Status, cancel_comment: str | None = None) -> str | None:
     current_status = order.status
-    if current_status == status:
-        return order
-    valid_prev_statuses: dict[Status, set[Status]] = {
-        Status.CREATED: {Status.FORMING},
-        Status.PAYED: {Status.CREATED},
-        Status.SEND_TO_SUPPLIER: {Status.CREATED},
-        Status.IN_PROCESS: {Status.SEND_TO_SUPPLIER},
-        Status.IN_DELIVERY: {Status.IN_PROCESS},
-        Status.DELIVERED: {Status.IN_DELIVERY},
-        Status.COMPLETED: {Status.DELIVERED},
-        Status.CANCELLED_BY_FACTORY: {
-            Status.CREATED,
-            Status.PAYED,
-            Status.SEND_TO_SUPPLIER,
-            Status.IN_PROCESS,
-        },
-        Status.CANCELLED_BY_SUPPLIER: {
-            Status.SEND_TO_SUPPLIER,
-            Status.IN_PROCESS,
-        },
-    }
-    if current_status not in valid_prev_statuses[status]:
+    if current_status not in VALID_PREV_STATUSES[status]:
         raise InvalidStatusError(
             f'Order with id={order.id} cannot switch status from {current_status} to {status}'
         )
@@ -153,8 +259,15 @@ async def set_next_status(order: Order, status: Status, cancel_comment: str | No
             raise InvalidStatusError(
                 f'Cancel comment must be set for status {status}'
             )
-    else:
-        cancel_comment = None
+        return cancel_comment
+    return None
+
 
-    order = await OrdersDAO.set_status(order.id, status, comment=cancel_comment)
-    return order
+async def set_next_status(order: Order, status: Status, cancel_comment: str | None = None) -> Order:
+    if order.status == status:
+        return order
+    cancel_comment = check_next_status(order, status, cancel_comment)
+    updated = await OrdersDAO.set_status(order.id, status, VALID_PREV_STATUSES[status], comment=cancel_comment)
+    if updated is None:
+        raise _status_changed_error(order, status)
+    return updated
@@ -1,30 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.auth.dependencies import get_current_user, get_current_admin_user
 from app.auth.models import User
 from app.products.dao import ProductDAO
-from app.products.schemas import SProduct, SProductRB, SProductFilters, SFullProduct, SSupplierShort
-from app.products.service import product_to_full_schema
-from app.schemas import SMessageResponse
+from app.products.schemas import SProduct, SProductRB, SProductFilters, SFullProduct
+from app.products.service import (
+    product_to_full_schema,
+    find_full_products,
+    update_product_data,
+    remove_product
+)
+from app.schemas import SMessageResponse, SPaginationParams, SPageResponse
+from app.database import get_unit_of_work
+from app.dependencies import get_pagination
+from app.export import ExportFormat, export_response
 
-router = APIRouter(prefix='/products', tags=['Products'])
+router = APIRouter(prefix='/products', tags=['Products'], dependencies=[Depends(get_unit_of_work)])
 
 @router.get("/")
 async def all_products(with_suppliers: bool = False,
                        filters: SProductFilters = Depends(),
-                       _: User = Depends(get_current_user)) -> list[SProduct | SFullProduct]:
+                       pagination: SPaginationParams = Depends(get_pagination),
+                       _: User = Depends(get_current_user)) -> SPageResponse[SProduct | SFullProduct]:
+    if filters.ranked and filters.title:
+        products = await ProductDAO.search(filters, with_suppliers)
+        return SPageResponse(
+            size=len(products),
+            payload=[
+                product_to_full_schema(prod) if with_suppliers else SProduct.model_validate(prod, from_attributes=True)
+                for prod in products
+            ],
+        )
+
     if with_suppliers:
-        products = await ProductDAO.find_all_full_by_filters(filters)
-        return [
-            product_to_full_schema(prod)
-            for prod in products
-        ]
+        product_ids = await ProductDAO.find_ids_by_filters(filters, pagination)
+        products = await find_full_products(product_ids[:pagination.page_size])
+        return SPageResponse.from_ids(product_ids, pagination, products)
 
-    products = await ProductDAO.find_all_by_filters(filters)
-    return [
-        SProduct.model_validate(prod, from_attributes=True)
-        for prod in products
-    ]
+    products = await ProductDAO.find_all_projected(SProduct, filters, pagination)
+    return SPageResponse.from_projection(products, pagination, SProduct)
+
+@router.get("/export/")
+async def export_products(export_format: ExportFormat = ExportFormat.NDJSON,
+                          with_suppliers: bool = False,
+                          filters: SProductFilters = Depends(),
+                          _: User = Depends(get_current_user)) -> StreamingResponse:
+    chunks = ProductDAO.stream_all_by_filters(filters, with_suppliers)
+    if with_suppliers:
+        return export_response(chunks, SFullProduct, export_format, 'products', product_to_full_schema)
+    return export_response(chunks, SProduct, export_format, 'products')
 
 @router.post("/")
 async def create_product(product: SProductRB,
@@ -36,7 +61,7 @@ async def create_product(product: SProductRB,
 @router.delete("/{product_id}/")
 async def delete_product(product_id: int,
                          _: User = Depends(get_current_admin_user)) -> SMessageResponse:
-    count = await ProductDAO.delete(id=product_id)
+    count = await remove_product(product_id)
     if count == 0:
         raise HTTPException(
             status_code=404,
@@ -50,17 +75,13 @@ async def delete_product(product_id: int,
 async def update_product(product_id: int,
                          product: SProductRB,
                          _: User = Depends(get_current_admin_user)) -> SProduct:
-    count = await ProductDAO.update(
-        filter_by={'id': product_id},
-        **product.model_dump(),
-    )
-    if count == 0:
+    updated = await update_product_data(product_id, product)
+    if updated is None:
         raise HTTPException(
             status_code=404,
             detail=f"Product with {product_id=} not found",
         )
-    new_product = await ProductDAO.find_one_or_none_by_id(product_id)
-    return SProduct.model_validate(new_product, from_attributes=True)
+    return updated
 
 
 
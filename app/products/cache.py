@@ -0,0 +1,18 @@
+from typing import Iterable
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import after_commit
+from app.invalidation import invalidation_bus
+from app.products.schemas import SFullProduct
+
+product_cache: TTLCache[int, SFullProduct] = TTLCache(
+    'products', settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS,
+)
+invalidation_bus.register(product_cache)
+
+
+def invalidate_products(product_ids: Iterable[int]) -> None:
+    product_ids = list(product_ids)
+    if product_ids:
+        after_commit(lambda: invalidation_bus.publish(product_cache.name, product_ids))
@@ -1,51 +1,136 @@
-from typing import Sequence
+from typing import AsyncIterator, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy import Select, select, update as sqlalchemy_update, values, column, BigInteger, Integer, func, literal, literal_column, or_
+from sqlalchemy.orm import joinedload, contains_eager, selectinload
 
-from app.dao.base import BaseDAO
-from app.database import async_session_maker
+from app.dao.base import BaseDAO, bind_param_chunks, ilike_contains, newer_snapshot
+from app.database import read_session, replica_session, write_session
 from app.orders.models import OrderProduct
-from app.products.models import Product
+from app.products.models import Product, SEARCH_CONFIG, product_search_vector
 from app.products.schemas import SProductFilters
-from app.suppliers.models import SupplierProduct
+from app.schemas import SPaginationParams
+from app.suppliers.models import Supplier, SupplierProduct
 
 
 class ProductDAO(BaseDAO[Product]):
     model = Product
 
     @classmethod
-    async def find_all_by_filters(cls, filters: SProductFilters | None) -> Sequence[Product]:
-        async with async_session_maker() as session:
+    def _with_suppliers(cls, query: Select) -> Select:
+        # One extra SELECT per page instead of repeating every product row, description included,
+        # once per supplier; only the columns SFullProduct needs are loaded for the suppliers.
+        return query.options(
+            selectinload(cls.model.suppliers)
+            .load_only(SupplierProduct.price)
+            .options(joinedload(SupplierProduct.supplier).load_only(Supplier.title))
+        )
+
+    @classmethod
+    def _filter(cls, query: Select, filters: SProductFilters) -> Select:
+        if filters.title:
+            query = query.where(ilike_contains(cls.model.title, filters.title))
+        return query
+
+    @classmethod
+    async def search(cls, filters: SProductFilters, with_suppliers: bool = False) -> Sequence[Product]:
+        """
+        Top ``filters.limit`` products with a word in the title similar to the search string or
+        whose title and description match it as a full-text query, best matches first.
+        Word similarity (``<%``) lets a short typed prefix match a long title, which plain
+        similarity of the whole title would rank below the threshold.
+        """
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), filters.title)
+        rank = func.greatest(
+            func.word_similarity(filters.title, cls.model.title),
+            func.ts_rank(product_search_vector, tsquery),
+        )
+        async with replica_session() as session:
             query = (
                 select(cls.model)
-                .where(cls.model.title.icontains(filters.title))
+                .where(or_(
+                    literal(filters.title).op('<%')(cls.model.title),
+                    product_search_vector.op('@@')(tsquery),
+                ))
+                .order_by(rank.desc(), cls.model.id)
+                .limit(filters.limit)
             )
+            if with_suppliers:
+                query = cls._with_suppliers(query)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
-    async def find_all_full_by_filters(cls, filters: SProductFilters | None) -> Sequence[Product]:
-        async with async_session_maker() as session:
-            query = (
-                select(cls.model)
-                .options(
-                    joinedload(cls.model.suppliers)
-                    .options(joinedload(SupplierProduct.supplier))
-                )
-                .where(cls.model.title.icontains(filters.title))
-            )
+    async def find_all_by_filters(cls,
+                                  filters: SProductFilters | None,
+                                  pagination: SPaginationParams | None = None) -> Sequence[Product]:
+        async with replica_session() as session:
+            query = cls._filter(select(cls.model), filters)
+            query = cls.paginate(query, pagination)
             result = await session.execute(query)
-            return result.scalars().unique().all()
+            return result.scalars().all()
+
+    @classmethod
+    async def find_ids_by_filters(cls,
+                                  filters: SProductFilters | None,
+                                  pagination: SPaginationParams | None = None) -> Sequence[int]:
+        async with replica_session() as session:
+            query = cls.paginate(cls._filter(select(cls.model.id), filters), pagination)
+            result = await session.execute(query)
+            return result.scalars().all()
 
     @classmethod
-    async def update_available_stock(cls, product_id: int, available: int) -> int:
-        count = await cls.update({'id': product_id}, available=available)
-        return count
+    async def find_all_full_by_ids(cls, product_ids: list[int]) -> Sequence[Product]:
+        # Fills the product cache, so it reads from the primary: a lagging replica could
+        # hand back rows as they were before a change whose invalidation already ran.
+        async with read_session() as session:
+            query = cls._with_suppliers(select(cls.model)).where(cls.model.id.in_(product_ids))
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    def stream_all_by_filters(cls,
+                              filters: SProductFilters,
+                              with_suppliers: bool = False) -> AsyncIterator[Sequence[Product]]:
+        query = cls._filter(select(cls.model), filters).order_by(cls.model.id)
+        if with_suppliers:
+            query = cls._with_suppliers(query)
+        return cls.stream(query)
+
+    @classmethod
+    async def bulk_update_available_stock(cls, stocks: dict[int, tuple[int, int]]) -> set[int]:
+        """
+        Applies stock snapshots given as product_id -> (available, snapshot time in ms) and returns
+        the ids of the products found. A snapshot older than the one a product holds leaves it as is.
+        """
+        if not stocks:
+            return set()
+        updated = set()
+        async with write_session() as session:
+            rows = [(product_id, available, snapshot_at) for product_id, (available, snapshot_at) in stocks.items()]
+            for chunk in bind_param_chunks(rows, 3):
+                new_stocks = values(
+                    column('product_id', Integer),
+                    column('available', Integer),
+                    column('snapshot_at', BigInteger),
+                    name='new_stocks',
+                ).data(chunk)
+                query = (
+                    sqlalchemy_update(cls.model)
+                    .where(cls.model.id == new_stocks.c.product_id)
+                    .values(newer_snapshot(
+                        cls.model.available, new_stocks.c.available,
+                        cls.model.available_snapshot_at, new_stocks.c.snapshot_at,
+                    ))
+                    .returning(cls.model.id)
+                    .execution_options(synchronize_session=False)
+                )
+                result = await session.execute(query)
+                updated.update(result.scalars().all())
+        return updated
 
     @classmethod
     async def find_full_by_order_id_and_supplier_id(cls, order_id: int, supplier_id: int) -> list[Product]:
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = (
                 select(cls.model)
                 .join(cls.model.suppliers)
@@ -57,8 +142,3 @@ class ProductDAO(BaseDAO[Product]):
             )
             result = await session.execute(query)
             return result.scalars().unique().all()
-
-
-
-
-
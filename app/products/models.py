@@ -1,6 +1,6 @@
 from enum import Enum
 
-from sqlalchemy import Text
+from sqlalchemy import BigInteger, Text, Index, func, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base, int_pk
 
@@ -10,11 +10,20 @@ class MeasureUnit(str, Enum):
     SET = 'Наборы'
     KIT = 'Комплекты'
 
+SEARCH_CONFIG = 'russian'
+
+
 class Product(Base):
+    __table_args__ = (
+        Index('ix_products_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
+
     id: Mapped[int_pk]
     title: Mapped[str]
     description: Mapped[str] = mapped_column(Text, nullable=False)
     available: Mapped[int]
+    # Kafka timestamp (ms) of the stock snapshot ``available`` was last set from
+    available_snapshot_at: Mapped[int | None] = mapped_column(BigInteger)
     unit: Mapped[MeasureUnit]
 
     suppliers: Mapped[list["SupplierProduct"]] = relationship(
@@ -32,4 +41,9 @@ class Product(Base):
         return f"{self.__class__.__name__}(id={self.id})"
 
 
-
+# Has to stay identical to the expression of ix_products_search_vector, otherwise the index is not used.
+# It is created by migration only, Alembic does not reflect expression indexes.
+product_search_vector = func.to_tsvector(
+    literal_column(f"'{SEARCH_CONFIG}'"),
+    Product.title + literal_column("' '") + Product.description,
+)
@@ -5,6 +5,8 @@ from app.products.models import MeasureUnit
 
 class SProductFilters(BaseModel):
     title: str = Field('', description="Подстрока наименования")
+    ranked: bool = Field(False, description="Поиск по релевантности наименования и описания")
+    limit: int = Field(20, ge=1, le=100, description="Количество лучших совпадений при поиске по релевантности")
 
 class SProduct(BaseModel):
     id: int = Field(..., description='Идентификатор')
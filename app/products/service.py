@@ -1,7 +1,11 @@
-from app.kafka.schemas import KafkaNewProductAvailable
+from typing import Sequence
+
+from app.products.cache import product_cache, invalidate_products
 from app.products.dao import ProductDAO
 from app.products.models import Product
-from app.products.schemas import SFullProduct, SSupplierShort
+from app.products.schemas import SFullProduct, SSupplierShort, SProduct, SProductRB
+from app.suppliers.cache import invalidate_suppliers
+from app.suppliers.dao import SupplierProductDAO
 
 
 def product_to_full_schema(product: Product) -> SFullProduct:
@@ -20,10 +24,33 @@ def product_to_full_schema(product: Product) -> SFullProduct:
         ]
     )
 
-async def update_available_stock(new_available: KafkaNewProductAvailable) -> None:
-    count = await ProductDAO.update_available_stock(
-        new_available.product_id,
-        new_available.available,
+async def find_full_products(product_ids: Sequence[int]) -> list[SFullProduct]:
+    async def load(missing: list[int]) -> dict[int, SFullProduct]:
+        products = await ProductDAO.find_all_full_by_ids(missing)
+        return {product.id: product_to_full_schema(product) for product in products}
+
+    found = await product_cache.get_many(product_ids, load)
+    return [found[product_id] for product_id in product_ids if product_id in found]
+
+async def update_product_data(product_id: int, product: SProductRB) -> SProduct | None:
+    updated = await ProductDAO.update_returning(
+        filter_by={'id': product_id},
+        **product.model_dump(),
     )
-    if count == 0:
-        raise ValueError('Something went wrong with updating available stock', new_available.model_dump())
+    if not updated:
+        return None
+    invalidate_products([product_id])
+    invalidate_suppliers(await SupplierProductDAO.find_supplier_ids_by_product_ids([product_id]))
+    return SProduct.model_validate(updated[0], from_attributes=True)
+
+async def remove_product(product_id: int) -> int:
+    supplier_ids = await SupplierProductDAO.find_supplier_ids_by_product_ids([product_id])
+    count = await ProductDAO.delete(id=product_id)
+    invalidate_products([product_id])
+    invalidate_suppliers(supplier_ids)
+    return count
+
+async def update_available_stocks(stocks: dict[int, tuple[int, int]]) -> set[int]:
+    updated = await ProductDAO.bulk_update_available_stock(stocks)
+    invalidate_products(updated)
+    return updated
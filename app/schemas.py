@@ -1,14 +1,67 @@
-from pydantic import BaseModel, Field
+import base64
+from functools import cache
+from typing import Any, Mapping, Sequence
+
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 
 class SMessageResponse(BaseModel):
     message: str = Field(..., description="Сообщение")
 
 
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f'Invalid cursor {cursor!r}')
+
+
 class SPaginationParams(BaseModel):
-    page_num: int = Field(1, ge=1, description="Номер страницы с 1")
-    page_size: int = Field(100, ge=10, description="Размер страницы с 10 до 100")
+    cursor: str | None = Field(None, description="Курсор следующей страницы из next_cursor")
+    page_size: int = Field(100, ge=10, le=100, description="Размер страницы с 10 до 100")
+
+    @field_validator('cursor')
+    @classmethod
+    def cursor_validator(cls, cursor: str | None) -> str | None:
+        if cursor is not None:
+            decode_cursor(cursor)
+        return cursor
+
+    @property
+    def after_id(self) -> int | None:
+        return decode_cursor(self.cursor) if self.cursor else None
+
+@cache
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
 
 class SPageResponse[T](BaseModel):
-    page: int = Field(1, ge=1, description="Номер страницы")
-    size: int = Field(100, ge=10, description="Размер страницы")
-    payload: list[T] = Field(..., description='Данные')
\ No newline at end of file
+    size: int = Field(..., ge=0, description="Количество записей на странице")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы, если она есть")
+    payload: list[T] = Field(..., description='Данные')
+
+    @classmethod
+    def from_ids(cls,
+                 ids: Sequence[int],
+                 pagination: SPaginationParams,
+                 payload: list[T]) -> "SPageResponse[T]":
+        """
+        Page of ``payload`` loaded separately for ``ids[:page_size]``. The cursor comes from the ids,
+        so rows that could not be loaded neither end the pagination early nor shift it.
+        """
+        has_next = len(ids) > pagination.page_size
+        next_cursor = encode_cursor(ids[pagination.page_size - 1]) if has_next else None
+        return cls(size=len(payload), next_cursor=next_cursor, payload=payload)
+
+    @classmethod
+    def from_projection(cls,
+                        rows: Sequence[Mapping[str, Any]],
+                        pagination: SPaginationParams,
+                        schema: type[BaseModel]) -> "SPageResponse[T]":
+        page = rows[:pagination.page_size]
+        next_cursor = encode_cursor(page[-1]['id']) if len(rows) > pagination.page_size else None
+        return cls(size=len(page), next_cursor=next_cursor, payload=_list_adapter(schema).validate_python(page))
@@ -11,31 +11,35 @@ from app.suppliers.schemas import (
     SFullSupplier,
     SSupplierProductRB
 )
-from app.schemas import SMessageResponse
+from app.schemas import SMessageResponse, SPaginationParams, SPageResponse
+from app.database import get_unit_of_work
+from app.dependencies import get_pagination
 from app.suppliers.service import (
-    supplier_to_full_schema,
     add_products_to_supplier,
     delete_products_from_supplier,
     update_supplier_data,
-    create_new_supplier
+    create_new_supplier,
+    find_full_supplier,
+    remove_supplier
 )
 
-router = APIRouter(prefix='/suppliers', tags=['Suppliers'])
+router = APIRouter(prefix='/suppliers', tags=['Suppliers'], dependencies=[Depends(get_unit_of_work)])
 
 
 @router.get('/')
 async def all_suppliers(filters: SSupplierFilters = Depends(),
-                        current_user: User = Depends(get_current_user)) -> list[SSupplier | SSupplierAdmin]:
-    suppliers = await SuppliersDAO.find_all_by_filters(filters)
-    if current_user.role == Role.ADMIN:
-        return [
-            SSupplierAdmin.model_validate(sup, from_attributes=True)
-            for sup in suppliers
-        ]
-    return [
-        SSupplier.model_validate(sup, from_attributes=True)
-        for sup in suppliers
-    ]
+                        pagination: SPaginationParams = Depends(get_pagination),
+                        current_user: User = Depends(get_current_user)) -> SPageResponse[SSupplier | SSupplierAdmin]:
+    schema = SSupplierAdmin if current_user.role == Role.ADMIN else SSupplier
+    if filters.ranked and filters.title:
+        suppliers = await SuppliersDAO.search(filters)
+        return SPageResponse(
+            size=len(suppliers),
+            payload=[schema.model_validate(sup, from_attributes=True) for sup in suppliers],
+        )
+
+    suppliers = await SuppliersDAO.find_all_projected(schema, filters, pagination)
+    return SPageResponse.from_projection(suppliers, pagination, schema)
 
 
 @router.post('/')
@@ -49,21 +53,19 @@ async def create_supplier(supplier: SSupplierRB,
 async def update_supplier(supplier_id: int,
                           supplier: SSupplierRB,
                           current_admin: User = Depends(get_current_admin_user)) -> SSupplierAdmin:
-    old_supplier = SuppliersDAO.find_one_or_none_by_id(supplier_id)
-    if old_supplier is None:
+    new_supplier = await update_supplier_data(current_admin.id, supplier_id, supplier)
+    if new_supplier is None:
         raise HTTPException(
             status_code=404,
             detail=f"Supplier with {supplier_id=} not found"
         )
-
-    new_supplier = await update_supplier_data(current_admin.id, supplier_id, supplier)
     return new_supplier
 
 
 @router.delete('/{supplier_id}/')
 async def delete_supplier(supplier_id: int,
                           _: User = Depends(get_current_admin_user)) -> SMessageResponse:
-    count = await SuppliersDAO.delete(id=supplier_id)
+    count = await remove_supplier(supplier_id)
     if count == 0:
         raise HTTPException(
             status_code=404,
@@ -77,13 +79,13 @@ async def delete_supplier(supplier_id: int,
 @router.get('/{supplier_id}/')
 async def get_supplier_by_id(supplier_id: int,
                              _: User = Depends(get_current_user)) -> SFullSupplier:
-    supplier = await SuppliersDAO.find_full_by_id(supplier_id)
+    supplier = await find_full_supplier(supplier_id)
     if supplier is None:
         raise HTTPException(
             status_code=404,
             detail=f"Supplier with {supplier_id=} not found",
         )
-    return supplier_to_full_schema(supplier)
+    return supplier
 
 
 @router.post('/{supplier_id}/products/')
@@ -0,0 +1,18 @@
+from typing import Iterable
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import after_commit
+from app.invalidation import invalidation_bus
+from app.suppliers.schemas import SFullSupplier
+
+supplier_cache: TTLCache[int, SFullSupplier] = TTLCache(
+    'suppliers', settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS,
+)
+invalidation_bus.register(supplier_cache)
+
+
+def invalidate_suppliers(supplier_ids: Iterable[int]) -> None:
+    supplier_ids = list(supplier_ids)
+    if supplier_ids:
+        after_commit(lambda: invalidation_bus.publish(supplier_cache.name, supplier_ids))
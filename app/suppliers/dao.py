@@ -1,92 +1,152 @@
 from typing import Sequence
 
 from sqlalchemy import (
+    Select,
     select,
     delete as sqlalchemy_delete,
     update as sqlalchemy_update,
+    values,
+    column,
+    BigInteger,
+    Integer,
+    String,
+    func,
+    literal,
 )
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.dao.base import BaseDAO
-from app.database import async_session_maker
+from app.dao.base import BaseDAO, bind_param_chunks, ilike_contains, newer_snapshot
+from app.database import read_session, replica_session, write_session
+from app.products.models import Product
 from app.suppliers.models import Supplier, SupplierProduct
 from app.suppliers.schemas import SSupplierFilters
+from app.schemas import SPaginationParams
 
 
 class SuppliersDAO(BaseDAO[Supplier]):
     model = Supplier
 
     @classmethod
-    async def find_all_by_filters(cls, filters: SSupplierFilters | None) -> Sequence[Supplier]:
-        async with async_session_maker() as session:
+    def _filter(cls, query: Select, filters: SSupplierFilters) -> Select:
+        if filters.title:
+            query = query.where(ilike_contains(cls.model.title, filters.title))
+        return query
+
+    @classmethod
+    async def find_all_by_filters(cls,
+                                  filters: SSupplierFilters | None,
+                                  pagination: SPaginationParams | None = None) -> Sequence[Supplier]:
+        async with replica_session() as session:
+            query = cls.paginate(cls._filter(select(cls.model), filters), pagination)
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def search(cls, filters: SSupplierFilters) -> Sequence[Supplier]:
+        # Word similarity, unlike similarity of the whole title, lets a typed prefix match.
+        async with replica_session() as session:
             query = (
                 select(cls.model)
-                .where(cls.model.title.icontains(filters.title))
+                .where(literal(filters.title).op('<%')(cls.model.title))
+                .order_by(func.word_similarity(filters.title, cls.model.title).desc(), cls.model.id)
+                .limit(filters.limit)
+            )
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def find_all_by_ogrns(cls, ogrns: list[str]) -> Sequence[Supplier]:
+        async with replica_session() as session:
+            query = (
+                select(cls.model)
+                .where(cls.model.ogrn.in_(ogrns))
             )
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
     async def find_full_by_id(cls, supplier_id: int) -> Supplier | None:
-        async with async_session_maker() as session:
+        # Fills the supplier cache, so it reads from the primary like ProductDAO.find_all_full_by_ids.
+        async with read_session() as session:
             query = (
                 select(cls.model)
                 .options(
-                    joinedload(cls.model.products)
-                    .options(joinedload(SupplierProduct.product))
+                    selectinload(cls.model.products)
+                    .options(joinedload(SupplierProduct.product).load_only(Product.title))
                 )
                 .where(cls.model.id == supplier_id)
             )
             result = await session.execute(query)
-            return result.scalars().unique().one_or_none()
+            return result.scalars().one_or_none()
 
 
 class SupplierProductDAO(BaseDAO[SupplierProduct]):
     model = SupplierProduct
 
+    @classmethod
+    async def find_supplier_ids_by_product_ids(cls, product_ids: list[int]) -> set[int]:
+        async with read_session() as session:
+            query = select(cls.model.supplier_id).where(cls.model.product_id.in_(product_ids)).distinct()
+            result = await session.execute(query)
+            return set(result.scalars().all())
+
+    @classmethod
+    async def find_product_ids_by_supplier_ids(cls, supplier_ids: list[int]) -> set[int]:
+        async with read_session() as session:
+            query = select(cls.model.product_id).where(cls.model.supplier_id.in_(supplier_ids)).distinct()
+            result = await session.execute(query)
+            return set(result.scalars().all())
+
     @classmethod
     async def delete_by_supplier_id_and_product_ids(
             cls,
             supplier_id: int,
             product_ids: list[int]
     ) -> int:
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = (
-                    sqlalchemy_delete(cls.model)
-                    .filter_by(supplier_id=supplier_id)
-                    .filter(cls.model.product_id.in_(product_ids))
-                )
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
-
-    @classmethod
-    async def update_price_by_supplier_id_and_product_code(
-            cls,
-            supplier_id: str,
-            product_code: str,
-            price: int
-    ) -> int:
-        async with async_session_maker() as session:
+        async with write_session() as session:
             query = (
-                sqlalchemy_update(cls.model)
-                .where(
-                    cls.model.supplier_id == supplier_id,
-                    cls.model.supplier_product_id == product_code,
-                )
-                .values(price=price)
-                .execution_options(synchronize_session="fetch")
+                sqlalchemy_delete(cls.model)
+                .filter_by(supplier_id=supplier_id)
+                .filter(cls.model.product_id.in_(product_ids))
             )
             result = await session.execute(query)
-            try:
-                await session.commit()
-            except SQLAlchemyError as e:
-                await session.rollback()
-                raise e
             return result.rowcount
+
+    @classmethod
+    async def bulk_update_prices(
+            cls,
+            prices: list[tuple[int, str, int, int]]
+    ) -> dict[tuple[int, str], int]:
+        """
+        Applies price snapshots given as (supplier_id, product_code, price, snapshot time in ms)
+        and maps every pair found to its product_id. A snapshot older than the one a row holds
+        leaves its price as is.
+        """
+        if not prices:
+            return {}
+        updated = {}
+        async with write_session() as session:
+            for chunk in bind_param_chunks(prices, 4):
+                new_prices = values(
+                    column('supplier_id', Integer),
+                    column('product_code', String),
+                    column('price', Integer),
+                    column('snapshot_at', BigInteger),
+                    name='new_prices',
+                ).data(chunk)
+                query = (
+                    sqlalchemy_update(cls.model)
+                    .where(
+                        cls.model.supplier_id == new_prices.c.supplier_id,
+                        cls.model.supplier_product_id == new_prices.c.product_code,
+                    )
+                    .values(newer_snapshot(
+                        cls.model.price, new_prices.c.price,
+                        cls.model.price_snapshot_at, new_prices.c.snapshot_at,
+                    ))
+                    .returning(cls.model.supplier_id, cls.model.supplier_product_id, cls.model.product_id)
+                    .execution_options(synchronize_session=False)
+                )
+                result = await session.execute(query)
+                updated.update({(row.supplier_id, row.supplier_product_id): row.product_id for row in result})
+        return updated
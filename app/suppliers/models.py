@@ -1,10 +1,14 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base, int_pk, str_uniq
 
 
 class Supplier(Base):
+    __table_args__ = (
+        Index('ix_suppliers_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
+
     id: Mapped[int_pk]
     ogrn: Mapped[str_uniq]
     title: Mapped[str_uniq]
@@ -24,10 +28,16 @@ class Supplier(Base):
 
 class SupplierProduct(Base):
     __tablename__ = "supplier_products"
+    __table_args__ = (
+        Index('ix_supplier_products_supplier_id_supplier_product_id', 'supplier_id', 'supplier_product_id'),
+    )
+
     supplier_id: Mapped[int] = mapped_column(ForeignKey('suppliers.id'), primary_key=True)
     product_id: Mapped[int] = mapped_column(ForeignKey('products.id'), primary_key=True)
     supplier_product_id: Mapped[str]
     price: Mapped[int]
+    # Kafka timestamp (ms) of the price snapshot ``price`` was last set from
+    price_snapshot_at: Mapped[int | None] = mapped_column(BigInteger)
 
     supplier: Mapped['Supplier'] = relationship(
         'Supplier',
@@ -14,6 +14,8 @@ class SSupplierRB(BaseModel):
 
 class SSupplierFilters(BaseModel):
     title: str = Field('', description="Наименование")
+    ranked: bool = Field(False, description="Поиск по схожести наименования")
+    limit: int = Field(20, ge=1, le=100, description="Количество лучших совпадений при поиске по схожести")
 
 class SSupplierProductRB(BaseModel):
     product_id: int = Field(..., description="Идентификатор товары")
@@ -1,6 +1,8 @@
 from slugify import slugify
 
 from app.kafka.schemas import KafkaNewSupplierPrice
+from app.products.cache import invalidate_products
+from app.suppliers.cache import supplier_cache, invalidate_suppliers
 from app.suppliers.dao import SupplierProductDAO, SuppliersDAO
 from app.suppliers.models import Supplier
 from app.suppliers.schemas import SFullSupplier, SProductShort, SSupplierProductRB, SSupplierAdmin, SSupplierRB
@@ -22,6 +24,14 @@ def supplier_to_full_schema(supplier: Supplier) -> SFullSupplier:
         ]
     )
 
+async def find_full_supplier(supplier_id: int) -> SFullSupplier | None:
+    async def load(missing: list[int]) -> dict[int, SFullSupplier]:
+        supplier = await SuppliersDAO.find_full_by_id(missing[0])
+        return {supplier.id: supplier_to_full_schema(supplier)} if supplier is not None else {}
+
+    found = await supplier_cache.get_many([supplier_id], load)
+    return found.get(supplier_id)
+
 async def create_new_supplier(admin_id: int,
                               supplier: SSupplierRB) -> SSupplierAdmin:
     supplier_dict = supplier.model_dump()
@@ -31,15 +41,26 @@ async def create_new_supplier(admin_id: int,
     return SSupplierAdmin.model_validate(new_supplier, from_attributes=True)
 
 
-async def update_supplier_data(admin_id: int, supplier_id: int, supplier: SSupplierRB) -> SSupplierAdmin:
+async def update_supplier_data(admin_id: int, supplier_id: int, supplier: SSupplierRB) -> SSupplierAdmin | None:
     supplier_dict = supplier.model_dump()
     supplier_dict['admin_id'] = admin_id
-    await SuppliersDAO.update(
+    updated = await SuppliersDAO.update_returning(
         filter_by={'id': supplier_id},
         **supplier_dict
     )
-    new_supplier = await SuppliersDAO.find_one_or_none_by_id(supplier_id)
-    return SSupplierAdmin.model_validate(new_supplier, from_attributes=True)
+    if not updated:
+        return None
+    invalidate_suppliers([supplier_id])
+    invalidate_products(await SupplierProductDAO.find_product_ids_by_supplier_ids([supplier_id]))
+    return SSupplierAdmin.model_validate(updated[0], from_attributes=True)
+
+
+async def remove_supplier(supplier_id: int) -> int:
+    product_ids = await SupplierProductDAO.find_product_ids_by_supplier_ids([supplier_id])
+    count = await SuppliersDAO.delete(id=supplier_id)
+    invalidate_suppliers([supplier_id])
+    invalidate_products(product_ids)
+    return count
 
 
 async def add_products_to_supplier(supplier: Supplier,
@@ -53,7 +74,9 @@ async def add_products_to_supplier(supplier: Supplier,
         }
         for product in products
     ]
-    await SupplierProductDAO.add_all(*new_products)
+    await SupplierProductDAO.upsert_many(new_products)
+    invalidate_suppliers([supplier.id])
+    invalidate_products(product.product_id for product in products)
     supplier = await SuppliersDAO.find_full_by_id(supplier.id)
     return supplier_to_full_schema(supplier)
 
@@ -61,20 +84,40 @@ async def add_products_to_supplier(supplier: Supplier,
 async def delete_products_from_supplier(supplier_id: int,
                                         products: list[int]) -> SFullSupplier:
     await SupplierProductDAO.delete_by_supplier_id_and_product_ids(supplier_id, products)
+    invalidate_suppliers([supplier_id])
+    invalidate_products(products)
     supplier = await SuppliersDAO.find_full_by_id(supplier_id)
     return supplier_to_full_schema(supplier)
 
 
-async def update_supplier_product_price(new_price: KafkaNewSupplierPrice) -> None:
-    supplier = await SuppliersDAO.find_one_or_none(ogrn=new_price.ogrn)
-    if supplier is None:
-        raise ValueError(f'Supplier with ogrn={new_price.ogrn} not found')
-    count = await SupplierProductDAO.update_price_by_supplier_id_and_product_code(
-        supplier.id,
-        new_price.product_code,
-        new_price.price,
-    )
-    if count == 0:
-        raise ValueError('Something went wrong while updating product price', new_price.model_dump())
+async def update_supplier_product_prices(
+        new_prices: list[tuple[KafkaNewSupplierPrice, int]]
+) -> list[Exception | None]:
+    """
+    Applies price snapshots, each with the time in ms it was taken, so that an older snapshot
+    never overwrites a newer one.
+    """
+    suppliers = await SuppliersDAO.find_all_by_ogrns(list({price.ogrn for price, _ in new_prices}))
+    supplier_ids = {supplier.ogrn: supplier.id for supplier in suppliers}
 
+    errors: list[Exception | None] = [None] * len(new_prices)
+    latest_prices: dict[tuple[int, str], tuple[int, int]] = {}
+    for i, (new_price, snapshot_at) in enumerate(new_prices):
+        supplier_id = supplier_ids.get(new_price.ogrn)
+        if supplier_id is None:
+            errors[i] = ValueError(f'Supplier with ogrn={new_price.ogrn} not found')
+            continue
+        key = (supplier_id, new_price.product_code)
+        if key not in latest_prices or latest_prices[key][1] <= snapshot_at:
+            latest_prices[key] = (new_price.price, snapshot_at)
 
+    updated = await SupplierProductDAO.bulk_update_prices([
+        (supplier_id, product_code, price, snapshot_at)
+        for (supplier_id, product_code), (price, snapshot_at) in latest_prices.items()
+    ])
+    invalidate_suppliers({supplier_id for supplier_id, _ in updated})
+    invalidate_products(set(updated.values()))
+    for i, (new_price, _) in enumerate(new_prices):
+        if errors[i] is None and (supplier_ids[new_price.ogrn], new_price.product_code) not in updated:
+            errors[i] = ValueError('Something went wrong while updating product price', new_price.model_dump())
+    return errors
@@ -0,0 +1,151 @@
+"""
+Compares the old joined eager loading of catalog reads with the selectin/load_only
+loaders now used by ProductDAO and SuppliersDAO.
+
+Seeds products supplied by dozens of suppliers inside one transaction that is rolled
+back at the end, then reports for each strategy the rows and approximate bytes the
+database returns and the wall time per query. Needs a migrated database.
+
+Usage: python -m benchmarks.catalog_loaders [iterations]
+"""
+import asyncio
+import sys
+import time
+from typing import Any
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.auth.models import User  # noqa: F401, registers the mappers the catalog models refer to
+from app.database import engine, unit_of_work
+from app.orders.models import Order  # noqa: F401
+from app.products.dao import ProductDAO
+from app.products.models import Product
+from app.schemas import SPaginationParams
+from app.suppliers.models import Supplier, SupplierProduct
+
+SEED = [
+    """
+    INSERT INTO suppliers (ogrn, title, topic_name_base)
+    SELECT 'bench-' || i, 'bench-' || i || ' ООО Поставщик', 'bench-' || i
+    FROM generate_series(1, 40) AS i
+    """,
+    """
+    INSERT INTO products (title, description, available, unit)
+    SELECT 'bench-' || i || ' Болт М' || (i % 30), repeat('Крепеж оцинкованный. ', 50), i % 1000, 'UNIT'::measureunit
+    FROM generate_series(1, 2000) AS i
+    """,
+    """
+    INSERT INTO supplier_products (supplier_id, product_id, supplier_product_id, price)
+    SELECT s.id, p.id, 'code-' || p.id, 100 + p.id % 1000
+    FROM suppliers s, products p
+    WHERE s.ogrn LIKE 'bench-%' AND p.title LIKE 'bench-%'
+    """,
+]
+
+
+def product_page_joined(first_id: int):
+    query = (
+        select(Product)
+        .options(
+            joinedload(Product.suppliers)
+            .options(joinedload(SupplierProduct.supplier))
+        )
+    )
+    return ProductDAO.paginate(query, SPaginationParams(page_size=100, cursor=None)).where(Product.id >= first_id)
+
+
+def product_page_selectin(first_id: int):
+    query = ProductDAO._with_suppliers(select(Product))
+    return ProductDAO.paginate(query, SPaginationParams(page_size=100, cursor=None)).where(Product.id >= first_id)
+
+
+def supplier_joined(supplier_id: int):
+    return (
+        select(Supplier)
+        .options(
+            joinedload(Supplier.products)
+            .options(joinedload(SupplierProduct.product))
+        )
+        .where(Supplier.id == supplier_id)
+    )
+
+
+def supplier_selectin(supplier_id: int):
+    return (
+        select(Supplier)
+        .options(
+            selectinload(Supplier.products)
+            .options(joinedload(SupplierProduct.product).load_only(Product.title))
+        )
+        .where(Supplier.id == supplier_id)
+    )
+
+
+class _Rollback(Exception):
+    pass
+
+
+async def _measure(session: AsyncSession, query, iterations: int) -> tuple[int, int, float]:
+    statements: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        result = await session.execute(query)
+        result.unique().scalars().all()
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+    session.expunge_all()
+
+    connection = await session.connection()
+    rows = size = 0
+    for statement, parameters in statements:
+        for row in await connection.exec_driver_sql(statement, parameters):
+            rows += 1
+            size += sum(len(str(value).encode()) for value in row if value is not None)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = await session.execute(query)
+        result.unique().scalars().all()
+        session.expunge_all()
+    return rows, size, (time.perf_counter() - started) / iterations
+
+
+async def run(iterations: int) -> None:
+    try:
+        async with unit_of_work() as session:
+            for statement in SEED:
+                await session.execute(text(statement))
+            await session.execute(text('ANALYZE products'))
+            await session.execute(text('ANALYZE supplier_products'))
+            first_product = (await session.execute(text(
+                "SELECT min(id) FROM products WHERE title LIKE 'bench-%'"
+            ))).scalar_one()
+            supplier = (await session.execute(text(
+                "SELECT min(id) FROM suppliers WHERE ogrn LIKE 'bench-%'"
+            ))).scalar_one()
+
+            cases = {
+                'products page, 100 x 40 suppliers': (product_page_joined(first_product),
+                                                      product_page_selectin(first_product)),
+                'supplier with 2000 products': (supplier_joined(supplier), supplier_selectin(supplier)),
+            }
+            for name, (joined, selectin) in cases.items():
+                for strategy, query in (('joinedload', joined), ('selectin', selectin)):
+                    rows, size, seconds = await _measure(session, query, iterations)
+                    print(f'{name:<36} {strategy:<10} rows: {rows:8d}   bytes: {size:10d}   '
+                          f'time: {seconds * 1000:8.2f} ms')
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
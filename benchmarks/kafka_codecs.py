@@ -0,0 +1,63 @@
+"""
+Microbenchmark of the Kafka codecs in app/kafka/codecs.py.
+
+Usage: python -m benchmarks.kafka_codecs [iterations]
+"""
+import sys
+import timeit
+from uuid import uuid4
+
+from app.kafka.codecs import JsonCodec, PydanticJsonCodec
+from app.kafka.schemas import (
+    KafkaNewSupplierPrice,
+    KafkaNewProductAvailable,
+    KafkaNewOrderSupplierStatus,
+    KafkaNewOrderStatus,
+    KafkaOrder,
+    KafkaProduct,
+    MessageType,
+)
+
+DECODE_SAMPLES = {
+    KafkaNewSupplierPrice: b'{"ogrn": "159317825", "product_code": "156562", "price": 100}',
+    KafkaNewProductAvailable: b'{"product_id": 2, "available": 1000}',
+    KafkaNewOrderSupplierStatus: (
+        b'{"order_number": "bf1dd005-1824-49b0-a7f9-1fb5dbcd573a", '
+        b'"status": "CANCELED", "cancel_comment": "\\u041c\\u044b \\u043f\\u0435\\u0440\\u0435\\u0434\\u0443\\u043c\\u0430\\u043b\\u0438"}'
+    ),
+}
+
+
+def _order_event() -> KafkaNewOrderStatus:
+    number = uuid4()
+    products = [
+        KafkaProduct(title=f'Гвозди {i} мм', code=str(156562 + i), amount=10, price=15, total_cost=150)
+        for i in range(20)
+    ]
+    return KafkaNewOrderStatus(
+        event_type=MessageType.NEW_ORDER,
+        order_number=number,
+        new_order=KafkaOrder(number=number, products=products, total_cost=3000),
+        new_status=None,
+    )
+
+
+def _report(name: str, baseline: float, fast: float, iterations: int) -> None:
+    print(f'{name:<36} json: {baseline / iterations * 1e6:8.2f} us   '
+          f'pydantic: {fast / iterations * 1e6:8.2f} us   x{baseline / fast:5.2f}')
+
+
+def main(iterations: int) -> None:
+    for model, payload in DECODE_SAMPLES.items():
+        baseline = timeit.timeit(lambda: JsonCodec(model).decode(payload), number=iterations)
+        fast = timeit.timeit(lambda: PydanticJsonCodec(model).decode(payload), number=iterations)
+        _report(f'decode {model.__name__}', baseline, fast, iterations)
+
+    event = _order_event()
+    baseline = timeit.timeit(lambda: JsonCodec(KafkaNewOrderStatus).encode(event), number=iterations)
+    fast = timeit.timeit(lambda: PydanticJsonCodec(KafkaNewOrderStatus).encode(event), number=iterations)
+    _report('encode KafkaNewOrderStatus', baseline, fast, iterations)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,94 @@
+"""
+Per-row cost of building list responses from ORM entities versus column projections.
+
+Runs against an in-memory SQLite database, so it measures only the Python side:
+ORM hydration plus from_attributes validation against a projected SELECT validated
+through a cached TypeAdapter, as BaseDAO.find_all_projected and SPageResponse.from_projection do.
+
+Usage: python -m benchmarks.projection_reads [rows] [repeats]
+"""
+import sys
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.auth.dao import UsersDAO
+from app.auth.models import User, Role
+from app.auth.schemas import SUser
+from app.orders.models import Order  # noqa: F401, registers the mappers the models refer to
+from app.products.dao import ProductDAO
+from app.products.models import Product, MeasureUnit
+from app.products.schemas import SProduct
+from app.suppliers.models import Supplier  # noqa: F401
+
+
+def _seed(session: Session, rows: int) -> None:
+    session.execute(insert(Product), [
+        {
+            'title': f'Болт М{i % 30}',
+            'description': 'Крепеж оцинкованный. ' * 5,
+            'available': i % 1000,
+            'unit': MeasureUnit.UNIT,
+        }
+        for i in range(rows)
+    ])
+    session.execute(insert(User), [
+        {
+            'email': f'user{i}@example.com',
+            'name': 'Иван',
+            'surname': 'Иванов',
+            'patronymic': 'Иванович',
+            'password': 'x',
+            'role': Role.USER,
+        }
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def _time(repeats: int, function) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(rows: int, repeats: int) -> None:
+    engine = create_engine('sqlite://')
+    for table in (User.__table__, Product.__table__):
+        table.create(engine)
+
+    with Session(engine) as session:
+        _seed(session, rows)
+
+    cases = {
+        'products': (Product, SProduct, ProductDAO),
+        'users': (User, SUser, UsersDAO),
+    }
+    for name, (model, schema, dao) in cases.items():
+        adapter = TypeAdapter(list[schema])
+
+        def orm() -> None:
+            with Session(engine) as session:
+                entities = session.execute(select(model)).scalars().all()
+                [schema.model_validate(entity, from_attributes=True) for entity in entities]
+
+        def projection() -> None:
+            with Session(engine) as session:
+                adapter.validate_python(session.execute(dao.project(schema)).mappings().all())
+
+        before = _time(repeats, orm)
+        after = _time(repeats, projection)
+        print(f'{name:<10} orm: {before / rows * 1e6:8.2f} us/row   '
+              f'projection: {after / rows * 1e6:8.2f} us/row   x{before / after:5.2f}')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
@@ -0,0 +1,279 @@
+"""
+Query plan checks for the DAO layer.
+
+Seeds a realistic volume of rows inside one transaction, runs every statement the DAO
+methods below execute through EXPLAIN (FORMAT JSON), streamed exports as cursors, and
+rolls everything back.
+Fails when a plan sequentially scans a large table or costs more than the recorded
+baseline allows, and when there is no baseline for a plan at all: record one with
+--write-baseline and commit query_plans.json. Needs a migrated database and no DB_REPLICA_HOST.
+
+Usage: python -m benchmarks.query_plans [--scale N] [--tolerance 0.2] [--write-baseline]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Coroutine
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dao import UsersDAO
+from app.auth.schemas import SUser
+from app.database import engine, replica_engine, unit_of_work
+from app.kafka.dao import ProcessedMessageDAO, OutboxDAO
+from app.orders.dao import OrdersDAO, OrderProductDAO
+from app.orders.models import Status
+from app.products.dao import ProductDAO
+from app.products.schemas import SProduct, SProductFilters
+from app.schemas import SPaginationParams, encode_cursor
+from app.suppliers.dao import SuppliersDAO, SupplierProductDAO
+from app.suppliers.schemas import SSupplierAdmin, SSupplierFilters
+
+BASELINE_PATH = Path(__file__).with_name('query_plans.json')
+
+SEED = [
+    """
+    INSERT INTO users (email, name, surname, patronymic, password, role)
+    SELECT 'plan-' || i || '@example.com', 'Иван', 'Иванов', NULL, 'x',
+           (CASE WHEN i % 100 = 0 THEN 'ADMIN' ELSE 'USER' END)::role
+    FROM generate_series(1, 10000 * :scale) AS i
+    """,
+    """
+    INSERT INTO suppliers (ogrn, title, topic_name_base)
+    SELECT 'plan-' || i, 'plan-' || i || ' ООО Поставщик', 'plan-' || i
+    FROM generate_series(1, 2000 * :scale) AS i
+    """,
+    """
+    INSERT INTO products (title, description, available, unit)
+    SELECT 'plan-' || i || ' ' || (ARRAY['Болт', 'Гайка', 'Шайба', 'Винт', 'Гвоздь', 'Саморез', 'Шуруп', 'Дюбель'])[1 + i % 8]
+               || ' М' || (i % 30),
+           'Крепеж оцинкованный, партия ' || md5(i::text),
+           i % 1000,
+           'UNIT'::measureunit
+    FROM generate_series(1, 200000 * :scale) AS i
+    """,
+    """
+    WITH s AS (SELECT array_agg(id) AS ids FROM suppliers WHERE ogrn LIKE 'plan-%'),
+         p AS (SELECT id, row_number() OVER (ORDER BY id) AS n FROM products WHERE title LIKE 'plan-%')
+    INSERT INTO supplier_products (supplier_id, product_id, supplier_product_id, price)
+    SELECT s.ids[1 + (p.n + k * 7919) % cardinality(s.ids)], p.id, 'code-' || p.id || '-' || k, 100 + p.id % 1000
+    FROM p, s, generate_series(0, 1) AS k
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    WITH u AS (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'plan-%'),
+         s AS (SELECT array_agg(id) AS ids FROM suppliers WHERE ogrn LIKE 'plan-%')
+    INSERT INTO orders (status, user_id, supplier_id)
+    SELECT (ARRAY['FORMING', 'CREATED', 'SEND_TO_SUPPLIER', 'IN_PROCESS', 'DELIVERED'])[1 + i % 5]::status,
+           u.ids[1 + i % cardinality(u.ids)],
+           s.ids[1 + i % cardinality(s.ids)]
+    FROM generate_series(1, 500000 * :scale) AS i, u, s
+    """,
+    """
+    WITH p AS (SELECT array_agg(id) AS ids FROM products WHERE title LIKE 'plan-%'),
+         o AS (SELECT id, row_number() OVER (ORDER BY id) AS n FROM orders
+               WHERE supplier_id IN (SELECT id FROM suppliers WHERE ogrn LIKE 'plan-%'))
+    INSERT INTO order_products (order_id, product_id, amount)
+    SELECT o.id, p.ids[1 + (o.n * 3 + k) % cardinality(p.ids)], 1 + k
+    FROM o, p, generate_series(0, 2) AS k
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO kafka_processed_messages (topic, partition, "offset")
+    SELECT 'plan', i % 4, i
+    FROM generate_series(1, 100000 * :scale) AS i
+    """,
+    """
+    INSERT INTO kafka_outbox (topic, key, payload)
+    SELECT 'plan', 'plan-' || i, '\\x00'::bytea
+    FROM generate_series(1, 50000 * :scale) AS i
+    """,
+]
+
+SEEDED_TABLES = (
+    'users', 'suppliers', 'products', 'supplier_products',
+    'orders', 'order_products', 'kafka_processed_messages', 'kafka_outbox',
+)
+
+SAMPLE = """
+    SELECT o.id AS order_id, o.number, o.user_id, o.supplier_id,
+           op.product_id, sp.supplier_product_id, s.ogrn, u.email
+    FROM orders o
+    JOIN order_products op ON op.order_id = o.id
+    JOIN supplier_products sp ON sp.product_id = op.product_id
+    JOIN suppliers s ON s.id = o.supplier_id
+    JOIN users u ON u.id = o.user_id
+    WHERE u.email LIKE 'plan-%'
+    ORDER BY o.id DESC
+    LIMIT 1
+"""
+
+Check = Callable[[Any], Coroutine[Any, Any, Any]]
+
+
+async def _first_chunk(chunks: AsyncIterator) -> None:
+    # Exports stream through their own session, so the cursor only sees committed rows;
+    # only the captured statement matters, it is explained in the seeding transaction.
+    async with aclosing(chunks):
+        async for _ in chunks:
+            break
+
+
+async def _publish_all(events) -> set[int]:
+    return {event.id for event in events}
+
+
+def checks() -> dict[str, Check]:
+    page = SPaginationParams(page_size=100)
+    return {
+        'ProductDAO.find_one_or_none_by_id': lambda s: ProductDAO.find_one_or_none_by_id(s.product_id),
+        'UsersDAO.find_one_or_none(email)': lambda s: UsersDAO.find_one_or_none(email=s.email),
+        'UsersDAO.find_all_projected': lambda s: UsersDAO.find_all_projected(
+            SUser, pagination=SPaginationParams(cursor=encode_cursor(s.user_id), page_size=100)),
+        'ProductDAO.find_all_projected': lambda s: ProductDAO.find_all_projected(
+            SProduct, SProductFilters(title='Болт'), page),
+        'ProductDAO.stream_all_by_filters': lambda s: _first_chunk(
+            ProductDAO.stream_all_by_filters(SProductFilters(title='Болт'))),
+        'ProductDAO.stream_all_by_filters(with_suppliers)': lambda s: _first_chunk(
+            ProductDAO.stream_all_by_filters(SProductFilters(title='Болт'), True)),
+        'ProductDAO.find_ids_by_filters': lambda s: ProductDAO.find_ids_by_filters(
+            SProductFilters(title='Болт'), SPaginationParams(cursor=encode_cursor(s.product_id), page_size=100)),
+        'ProductDAO.find_all_full_by_ids': lambda s: ProductDAO.find_all_full_by_ids(
+            list(range(s.product_id, s.product_id + 100))),
+        'ProductDAO.search': lambda s: ProductDAO.search(SProductFilters(title='Болт М12', ranked=True), True),
+        'ProductDAO.find_full_by_order_id_and_supplier_id': lambda s: ProductDAO.find_full_by_order_id_and_supplier_id(
+            s.order_id, s.supplier_id),
+        'ProductDAO.bulk_update_available_stock': lambda s: ProductDAO.bulk_update_available_stock({s.product_id: (5, 0)}),
+        'SuppliersDAO.find_all_projected': lambda s: SuppliersDAO.find_all_projected(
+            SSupplierAdmin, SSupplierFilters(title='Поставщик'), page),
+        'SuppliersDAO.search': lambda s: SuppliersDAO.search(SSupplierFilters(title='ООО Поставщик', ranked=True)),
+        'SuppliersDAO.find_all_by_ogrns': lambda s: SuppliersDAO.find_all_by_ogrns([s.ogrn]),
+        'SuppliersDAO.find_full_by_id': lambda s: SuppliersDAO.find_full_by_id(s.supplier_id),
+        'SupplierProductDAO.find_supplier_ids_by_product_ids': lambda s: SupplierProductDAO.find_supplier_ids_by_product_ids(
+            [s.product_id]),
+        'SupplierProductDAO.find_product_ids_by_supplier_ids': lambda s: SupplierProductDAO.find_product_ids_by_supplier_ids(
+            [s.supplier_id]),
+        'SupplierProductDAO.bulk_update_prices': lambda s: SupplierProductDAO.bulk_update_prices(
+            [(s.supplier_id, s.supplier_product_id, 10, 0)]),
+        'OrdersDAO.find_all_projected_by_user_id(user)': lambda s: OrdersDAO.find_all_projected_by_user_id(
+            s.user_id, page),
+        'OrdersDAO.find_all_projected_by_user_id(admin)': lambda s: OrdersDAO.find_all_projected_by_user_id(
+            None, SPaginationParams(cursor=encode_cursor(s.order_id // 2), page_size=100)),
+        'OrdersDAO.stream_all_by_user_id(user)': lambda s: _first_chunk(OrdersDAO.stream_all_by_user_id(s.user_id)),
+        'OrdersDAO.stream_all_by_user_id(admin)': lambda s: _first_chunk(OrdersDAO.stream_all_by_user_id(None)),
+        'OrdersDAO.find_full_by_id': lambda s: OrdersDAO.find_full_by_id(s.order_id),
+        'OrdersDAO.find_statuses_by_numbers': lambda s: OrdersDAO.find_statuses_by_numbers({s.number}),
+        'OrdersDAO.bulk_set_status': lambda s: OrdersDAO.bulk_set_status(
+            [(Status.IN_DELIVERY, {Status.IN_PROCESS}, {s.number: None})]),
+        'OrdersDAO.set_status': lambda s: OrdersDAO.set_status(s.order_id, Status.CREATED, set(Status)),
+        'OrderProductDAO.delete_by_order_id_and_product_ids': lambda s: OrderProductDAO.delete_by_order_id_and_product_ids(
+            s.order_id, [s.product_id]),
+        'ProcessedMessageDAO.find_offsets': lambda s: ProcessedMessageDAO.find_offsets('plan', 1, 99000),
+        'OutboxDAO.relay_batch': lambda s: OutboxDAO.relay_batch(500, _publish_all),
+    }
+
+
+def _walk(plan: dict) -> list[dict]:
+    nodes = [plan]
+    for child in plan.get('Plans', ()):
+        nodes.extend(_walk(child))
+    return nodes
+
+
+class _Rollback(Exception):
+    pass
+
+
+async def _explain(session: AsyncSession, statements: list[tuple[str, Any, bool]]) -> list[dict]:
+    connection = await session.connection()
+    plans = []
+    for statement, parameters, streamed in statements:
+        # A server-side cursor is planned for fast start, see cursor_tuple_fraction
+        if streamed:
+            statement = f'DECLARE query_plan_check NO SCROLL CURSOR FOR {statement}'
+        result = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+        plan = result.scalar_one()
+        plans.append((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan'])
+    return plans
+
+
+async def run(scale: int, tolerance: float, min_rows: int, write_baseline: bool) -> int:
+    if replica_engine is not None:
+        print('Unset DB_REPLICA_HOST: seeded rows are only visible on the primary')
+        return 2
+
+    if not BASELINE_PATH.exists() and not write_baseline:
+        print(f'No baseline at {BASELINE_PATH}: run with --write-baseline and commit it')
+        return 2
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    costs: dict[str, float] = {}
+    failures: list[str] = []
+    captured: list[tuple[str, Any, bool]] | None = None
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if captured is not None:
+            options = context.execution_options
+            streamed = bool(options.get('stream_results') or options.get('yield_per'))
+            captured.append((statement, parameters, streamed))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        async with unit_of_work() as session:
+            for statement in SEED:
+                await session.execute(text(statement), {'scale': scale})
+            for table in SEEDED_TABLES:
+                await session.execute(text(f'ANALYZE {table}'))
+            sizes = dict((await session.execute(text(
+                'SELECT relname, reltuples FROM pg_class WHERE relname = ANY(:tables)'
+            ), {'tables': list(SEEDED_TABLES)})).all())
+            sample = (await session.execute(text(SAMPLE))).one()
+
+            for name, check in checks().items():
+                captured = []
+                await check(sample)
+                statements, captured = captured, None
+                for i, plan in enumerate(await _explain(session, statements)):
+                    key = f'{name}#{i}'
+                    costs[key] = plan['Total Cost']
+                    for node in _walk(plan):
+                        relation = node.get('Relation Name')
+                        if node['Node Type'] == 'Seq Scan' and sizes.get(relation, 0) >= min_rows:
+                            failures.append(f'{key}: sequential scan of {relation}')
+                    limit = baseline.get(key)
+                    if limit is None:
+                        failures.append(f'{key}: no baseline cost recorded')
+                    elif plan['Total Cost'] > limit * (1 + tolerance):
+                        failures.append(f'{key}: cost {plan["Total Cost"]:.2f} > baseline {limit:.2f}')
+                    print(f'{key:<64} cost {plan["Total Cost"]:12.2f}')
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+        await engine.dispose()
+
+    if write_baseline:
+        BASELINE_PATH.write_text(json.dumps(costs, indent=2, ensure_ascii=False, sort_keys=True) + '\n')
+        print(f'Baseline written to {BASELINE_PATH}')
+        failures = [failure for failure in failures if not failure.endswith('no baseline cost recorded')]
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='EXPLAIN every DAO query against a seeded database')
+    parser.add_argument('--scale', type=int, default=1, help='multiplier for the seeded row counts')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed cost growth over the baseline')
+    parser.add_argument('--min-rows', type=int, default=10000, help='smallest table a sequential scan fails on')
+    parser.add_argument('--write-baseline', action='store_true', help='record current costs as the baseline')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.scale, args.tolerance, args.min_rows, args.write_baseline)))
+
+
+if __name__ == '__main__':
+    main()